@@ -1,12 +1,33 @@
 # app.py
 
+import os
+
 import streamlit as st
 
-page1 = st.Page("pages/page1.py", title="积分排行榜")
-page2 = st.Page("pages/page2.py", title="AI智能助教")
-page3 = st.Page("pages/page3.py", title="课程知识图谱")
+from common import metrics
+from common.theme import apply_theme, configure_page
 
-pg = st.navigation({"功能菜单":[page1, page2, page3]})
-pg.run()
+configure_page()
+
+# 指标的HTTP导出端点，进程内只启动一次；端口被占用时不再每次重跑都重试
+@st.cache_resource
+def start_metrics_exporter(port, host):
+    return metrics.serve(port, host)
 
+if metrics.ENABLED and os.environ.get("APP_METRICS_PORT"):
+    start_metrics_exporter(int(os.environ["APP_METRICS_PORT"]),
+                           os.environ.get("APP_METRICS_HOST", "127.0.0.1"))
 
+page1 = st.Page("pages/page1.py", title="积分排行榜", icon="🏅")
+page2 = st.Page("pages/page2.py", title="AI智能助教", icon="🤖")
+page3 = st.Page("pages/page3.py", title="课程知识图谱", icon="📒")
+page4 = st.Page("pages/page4.py", title="运行指标", icon="📈")
+
+# 运行指标页面只在设置了管理员密码时出现，页面内还要输入密码
+pages = {"功能菜单":[page1, page2, page3]}
+if os.environ.get("APP_ADMIN_PASSWORD"):
+    pages["管理"] = [page4]
+
+pg = st.navigation(pages)
+apply_theme()
+pg.run()
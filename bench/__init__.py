@@ -0,0 +1 @@
+"""本地压测与基准工具"""
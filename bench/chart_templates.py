@@ -0,0 +1,134 @@
+"""排行榜图表渲染开销对比：每次重跑构建Altair图表 vs 缓存的Vega-Lite模板
+
+两种写法都走Streamlit生成图表消息的同一套内部步骤（Altair转Vega-Lite、数据转
+Arrow、规格JSON化），统计每次重跑三张图表的服务端耗时和消息字节数。旧写法分别
+用全部学生和前K名学生测一次，区分模板和前K名选择各自的效果。
+
+    python -m bench.chart_templates --students 5000 --groups 200
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+from streamlit.elements.vega_charts import (
+    _convert_altair_to_vega_lite_spec,
+    _marshall_chart_data,
+    _prepare_vega_lite_spec,
+    _stabilize_vega_json_spec,
+)
+from streamlit.proto.ArrowVegaLiteChart_pb2 import ArrowVegaLiteChart
+
+from leaderboard.charts import CHART_HEIGHT, GROUP_COLUMNS, STUDENT_COLUMNS, build_templates
+from leaderboard.topk import top_k
+
+
+def _marshall(spec, data=None):
+    """与st.vega_lite_chart相同的消息生成步骤，返回消息字节数"""
+    proto = ArrowVegaLiteChart()
+    spec = _prepare_vega_lite_spec(spec, use_container_width=True)
+    _marshall_chart_data(proto, spec, data)
+    proto.spec = _stabilize_vega_json_spec(json.dumps(spec))
+    return proto.ByteSize()
+
+
+def legacy_render(students, groups, max_points):
+    """改造前页面中的三张图表"""
+    chart = alt.Chart(students).mark_bar(cornerRadiusTopLeft=3, cornerRadiusTopRight=3).encode(
+        x=alt.X('姓名:N', sort='-y', axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('积点:Q', axis=alt.Axis(title='积点')),
+        color=alt.Color('积点:Q', scale=alt.Scale(scheme='blues', domain=[0, max_points]),
+                        legend=alt.Legend(title='积点')),
+        tooltip=[alt.Tooltip('姓名:N', title='学生'), alt.Tooltip('积点:Q', title='积点'),
+                 alt.Tooltip('参与活动次数:Q', title='活动次数')],
+    ).properties(width='container', height=CHART_HEIGHT).configure_view(stroke=None).configure_axis(
+        labelFontSize=11, titleFontSize=12, gridColor='#e2e8f0')
+    tooltip = [alt.Tooltip('小组:N', title='小组'), alt.Tooltip('累积积点:Q', title='累积积点'),
+               alt.Tooltip('组员人数:Q', title='组员人数'), alt.Tooltip('平均积点:Q', title='平均积点')]
+    pie = alt.Chart(groups).mark_arc(innerRadius=50, strokeWidth=1, stroke='#ffffff').encode(
+        theta=alt.Theta(field="累积积点", type="quantitative"),
+        color=alt.Color(field="小组", type="nominal", scale=alt.Scale(scheme='category10')),
+        tooltip=tooltip,
+    ).properties(width='container', height=CHART_HEIGHT).configure_view(stroke=None)
+    bar = alt.Chart(groups).mark_bar(cornerRadiusTopLeft=3, cornerRadiusTopRight=3).encode(
+        x=alt.X('小组:N', axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('累积积点:Q', axis=alt.Axis(title='累积积点')),
+        color=alt.Color('累积积点:Q', scale=alt.Scale(scheme='greens', domain=[0, groups["累积积点"].max()]),
+                        legend=alt.Legend(title='累积积点')),
+        tooltip=tooltip,
+    ).properties(width='container', height=CHART_HEIGHT).configure_view(stroke=None).configure_axis(
+        labelFontSize=11, titleFontSize=12, gridColor='#e2e8f0')
+    return sum(_marshall(_convert_altair_to_vega_lite_spec(c)) for c in (chart, pie, bar))
+
+
+def template_render(templates, students, groups):
+    """模板写法：规格已缓存，只生成数据"""
+    return (_marshall(templates["students"], students[STUDENT_COLUMNS])
+            + _marshall(templates["group_pie"], groups[GROUP_COLUMNS])
+            + _marshall(templates["group_bar"], groups[GROUP_COLUMNS]))
+
+
+def make_data(n_students, n_groups, seed=0):
+    rng = np.random.default_rng(seed)
+    students = pd.DataFrame({
+        "学号": [f"S{i:06d}" for i in range(n_students)],
+        "姓名": [f"学生{i}" for i in range(n_students)],
+        "积点": rng.integers(0, 30, n_students),
+        "性别": rng.choice(["男", "女"], n_students),
+        "参与活动次数": rng.integers(0, 12, n_students),
+    })
+    points = rng.integers(0, 60, n_groups)
+    members = rng.integers(3, 8, n_groups)
+    groups = pd.DataFrame({
+        "小组": [f"第{i + 1}组" for i in range(n_groups)],
+        "累积积点": points,
+        "组员人数": members,
+        "平均积点": np.round(points / members, 1),
+        "中位积点": np.floor(points / members),
+        "参与率": np.round(rng.uniform(0, 100, n_groups), 1),
+    })
+    return students, groups
+
+
+def _time(fn, repeat):
+    samples, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = fn()
+        samples.append(time.perf_counter() - started)
+    return {"median_ms": round(statistics.median(samples) * 1000, 3), "bytes": size}
+
+
+def run(n_students=5000, n_groups=200, k=10, repeat=20):
+    students, groups = make_data(n_students, n_groups)
+    order, ranks = top_k(students["积点"].to_numpy(), students["参与活动次数"].to_numpy(), k)
+    top = students.iloc[order].assign(排名=ranks)
+    max_points = students["积点"].max()
+
+    started = time.perf_counter()
+    templates = build_templates()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "students": n_students,
+        "groups": n_groups,
+        "k": k,
+        "template_build_ms": round(build_ms, 3),
+        "legacy_all_students": _time(lambda: legacy_render(students, groups, max_points), repeat),
+        "legacy_top_k": _time(lambda: legacy_render(top, groups, max_points), repeat),
+        "template_top_k": _time(lambda: template_render(templates, top, groups), repeat),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="排行榜图表渲染开销对比")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.students, args.groups, args.k, args.repeat), indent=2, ensure_ascii=False))
@@ -0,0 +1,119 @@
+"""本地模拟的LKE Socket.IO服务端
+
+实现AI助教用到的那一小部分协议：Engine.IO握手、`40{token}`认证、`2`/`3`心跳，
+以及收到`send`事件后按request_id流式返回累积内容的`reply`帧。
+
+    python -m bench.fake_lke --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import uuid
+
+import websockets
+
+
+class FakeLKEServer:
+    """模拟LKE对话服务，回复内容为累积文本，与线上行为一致"""
+
+    def __init__(self, host="127.0.0.1", port=0, answer_chars=400, chunk_chars=8,
+                 chunk_delay=0.02, first_byte_delay=0.05, ping_interval=None):
+        self.host = host
+        self.port = port
+        self.answer_chars = answer_chars
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.first_byte_delay = first_byte_delay
+        self.ping_interval = ping_interval
+        self.stats = {"connections": 0, "auths": 0, "requests": 0, "pongs": 0}
+        self._server = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/v1/qbot/chat/conn/?EIO=4&transport=websocket"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, ws):
+        self.stats["connections"] += 1
+        ping_ms = int((self.ping_interval or 25) * 1000)
+        await ws.send("0" + json.dumps({"sid": uuid.uuid4().hex, "upgrades": [],
+                                        "pingInterval": ping_ms, "pingTimeout": 20000}))
+        auth = await ws.recv()
+        token = json.loads(auth[2:] or "{}").get("token") if auth.startswith("40") else None
+        if not token:
+            await ws.send('44{"message":"invalid token"}')
+            await ws.close()
+            return
+        self.stats["auths"] += 1
+        await ws.send("40" + json.dumps({"sid": uuid.uuid4().hex}))
+
+        tasks = set()
+        if self.ping_interval:
+            tasks.add(asyncio.create_task(self._ping(ws)))
+        try:
+            async for msg in ws:
+                if msg == "3":
+                    self.stats["pongs"] += 1
+                    continue
+                if not msg.startswith("42"):
+                    continue
+                event = json.loads(msg[2:])
+                if event[0] == "send":
+                    task = asyncio.create_task(self._answer(ws, event[1]["payload"]))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send("2")
+
+    def answer_for(self, content):
+        text = f"关于「{content}」的模拟回答。"
+        return (text * (self.answer_chars // len(text) + 1))[:self.answer_chars]
+
+    async def _answer(self, ws, payload):
+        self.stats["requests"] += 1
+        base = {"request_id": payload["request_id"], "session_id": payload["session_id"]}
+        await ws.send("42" + json.dumps(["reply", {"payload": dict(
+            base, content=payload["content"], is_from_self=True, is_final=True)}], ensure_ascii=False))
+        await asyncio.sleep(self.first_byte_delay)
+        answer = self.answer_for(payload["content"])
+        for end in range(self.chunk_chars, len(answer) + self.chunk_chars, self.chunk_chars):
+            frame = dict(base, content=answer[:end], is_from_self=False, is_final=end >= len(answer))
+            await ws.send("42" + json.dumps(["reply", {"payload": frame}], ensure_ascii=False))
+            await asyncio.sleep(self.chunk_delay)
+
+
+async def _serve_forever(args):
+    server = FakeLKEServer(args.host, args.port, answer_chars=args.answer_chars,
+                           chunk_chars=args.chunk_chars, chunk_delay=args.chunk_delay,
+                           ping_interval=args.ping_interval)
+    print(await server.start(), flush=True)
+    await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟LKE对话服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--answer-chars", type=int, default=400)
+    parser.add_argument("--chunk-chars", type=int, default=8)
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    parser.add_argument("--ping-interval", type=float, default=5)
+    asyncio.run(_serve_forever(parser.parse_args()))
@@ -0,0 +1,94 @@
+"""AI助教网关压测：模拟一个班的学生同时提问
+
+在本地启动模拟LKE服务，每个学生用一个线程（相当于一个Streamlit脚本线程）通过
+TutorGateway连续提问，统计首字延迟、完整回答耗时、排队拒绝数和上游连接数。
+
+    python -m bench.load_tutor --users 60 --questions 3
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.fake_lke import FakeLKEServer
+from tutor.connection import BackgroundLoop
+from tutor.gateway import GatewayBusy, TutorGateway
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 4)
+
+
+def _student(gateway, user, questions, results):
+    for i in range(questions):
+        started = time.perf_counter()
+        first = None
+        try:
+            for event, data in gateway.stream("class", lambda: "bench-token", f"user-{user}", f"问题{i}"):
+                if event == "reply" and not data["payload"]["is_from_self"] and first is None:
+                    first = time.perf_counter() - started
+            results["ttft"].append(first)
+            results["total"].append(time.perf_counter() - started)
+        except GatewayBusy:
+            results["busy"] += 1
+        except Exception:
+            results["errors"] += 1
+
+
+def run(users=60, questions=3, max_connections=4, max_concurrency=32, max_queue=64,
+        answer_chars=400, chunk_delay=0.02):
+    server_loop = BackgroundLoop("fake-lke")
+    server = FakeLKEServer(answer_chars=answer_chars, chunk_delay=chunk_delay, ping_interval=5)
+    url = server_loop.submit(server.start()).result()
+    gateway = TutorGateway(url, max_connections=max_connections,
+                           max_concurrency=max_concurrency, max_queue=max_queue)
+
+    results = {"ttft": [], "total": [], "busy": 0, "errors": 0}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        for user in range(users):
+            pool.submit(_student, gateway, user, questions, results)
+        peak_threads = threading.active_count()
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "users": users,
+        "questions": users * questions,
+        "answered": len(results["total"]),
+        "busy": results["busy"],
+        "errors": results["errors"],
+        "elapsed_s": round(elapsed, 3),
+        "answers_per_s": round(len(results["total"]) / elapsed, 2),
+        "ttft_p50_s": _percentile(results["ttft"], 0.5),
+        "ttft_p95_s": _percentile(results["ttft"], 0.95),
+        "total_p50_s": _percentile(results["total"], 0.5),
+        "total_p95_s": _percentile(results["total"], 0.95),
+        "total_mean_s": round(statistics.mean(results["total"]), 4) if results["total"] else None,
+        "upstream_connections": server.stats["connections"],
+        "gateway_connections": gateway.connections,
+        "peak_threads": peak_threads,
+    }
+    gateway.close()
+    server_loop.submit(server.stop()).result()
+    server_loop.stop()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI助教网关压测")
+    parser.add_argument("--users", type=int, default=60)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--max-connections", type=int, default=4)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--answer-chars", type=int, default=400)
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, args.questions, args.max_connections, args.max_concurrency,
+                         args.max_queue, args.answer_chars, args.chunk_delay), indent=2, ensure_ascii=False))
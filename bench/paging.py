@@ -0,0 +1,70 @@
+"""排行表分页前后的重跑开销对比
+
+整表写法每次重跑把全部学生转成Arrow发给浏览器；分页写法的排序顺序缓存一次，
+之后每次重跑只取一页转成Arrow。统计两种写法每次重跑的耗时和消息字节数。
+
+    python -m bench.paging --students 50000 --page-size 20
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+
+from leaderboard.paging import page_count, page_rows, sort_order
+
+TABLE_COLUMNS = ["姓名", "小组", "积点", "参与活动次数"]
+
+
+def make_students(n_students, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "姓名": [f"学生{i}" for i in range(n_students)],
+        "小组": [f"第{i % 500 + 1}组" for i in range(n_students)],
+        "积点": rng.integers(0, 30, n_students),
+        "参与活动次数": rng.integers(0, 12, n_students),
+    })
+
+
+def _time(fn, repeat):
+    samples, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = fn()
+        samples.append(time.perf_counter() - started)
+    return {"median_ms": round(statistics.median(samples) * 1000, 3), "bytes": size}
+
+
+def run(n_students=50000, page_size=20, repeat=20):
+    students = make_students(n_students)
+
+    started = time.perf_counter()
+    order = sort_order(students, "积点", ascending=False)
+    sort_ms = (time.perf_counter() - started) * 1000
+    last_page = page_count(len(students), page_size)
+
+    return {
+        "students": n_students,
+        "page_size": page_size,
+        "sort_ms": round(sort_ms, 3),
+        "full_table": _time(lambda: len(convert_pandas_df_to_arrow_bytes(students[TABLE_COLUMNS])), repeat),
+        "first_page": _time(
+            lambda: len(convert_pandas_df_to_arrow_bytes(page_rows(students, order, 1, page_size)[TABLE_COLUMNS])),
+            repeat),
+        "last_page": _time(
+            lambda: len(convert_pandas_df_to_arrow_bytes(page_rows(students, order, last_page, page_size)[TABLE_COLUMNS])),
+            repeat),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="排行表分页前后的重跑开销对比")
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.students, args.page_size, args.repeat), indent=2, ensure_ascii=False))
@@ -0,0 +1,75 @@
+"""页面启动的导入耗时分解
+
+在新的解释器中先导入streamlit（app.py本身已经付出的部分），再执行页面顶层的导入
+语句，用 -X importtime 统计之后导入的模块：每个页面的导入总耗时、各顶层导入的
+累计耗时和自身耗时最多的模块。
+
+    python -m bench.startup_profile
+    python -m bench.startup_profile pages/page2.py --top 20
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["pages/page1.py", "pages/page2.py", "pages/page3.py"]
+
+_MARKER = "--startup-profile--"
+
+
+def page_imports(path):
+    """页面模块顶层的导入语句，函数内部的延迟导入不算"""
+    with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def _parse(stderr):
+    """解析 -X importtime 输出中标记之后的行，返回[(模块, 自身us, 累计us, 是否顶层)]"""
+    rows, started = [], False
+    for line in stderr.splitlines():
+        if line == _MARKER:
+            started = True
+            continue
+        if not started or not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        rows.append((name.strip(), int(self_us), int(cumulative_us), not name[1:].startswith(" ")))
+    return rows
+
+
+def profile(statements, baseline=("import streamlit",)):
+    code = "\n".join([*baseline, f"import sys; sys.stderr.write({_MARKER!r} + '\\n')", *statements])
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return _parse(result.stderr)
+
+
+def run(pages=PAGES, top=10):
+    report = {}
+    for path in pages:
+        statements = page_imports(path)
+        rows = profile(statements)
+        report[path] = {
+            "total_ms": round(sum(row[1] for row in rows) / 1000, 1),
+            "modules": len(rows),
+            "top_level": {name: round(cumulative / 1000, 1)
+                          for name, _, cumulative, is_top in sorted(rows, key=lambda row: -row[2]) if is_top},
+            "slowest_self": {name: round(self_us / 1000, 1)
+                             for name, self_us, _, _ in sorted(rows, key=lambda row: -row[1])[:top]},
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="页面启动的导入耗时分解")
+    parser.add_argument("pages", nargs="*", default=PAGES)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.pages, args.top), indent=2, ensure_ascii=False))
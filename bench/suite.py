@@ -0,0 +1,266 @@
+"""三个页面的重跑性能基准
+
+用Streamlit的AppTest按脚本驱动页面重跑，记录每次重跑的耗时、tracemalloc峰值内存
+和发给浏览器的delta消息字节数，结果写成JSON，便于不同版本之间对比：
+
+- 积分排行榜：切换班级、逐字输入搜索词、修改日期、翻页，合成1k/10k/100k名学生
+- AI智能助教：对本地模拟LKE服务连续提问，Token直接返回固定值
+- 知识图谱：切换主题、调整节点大小和边的粗细、搜索知识点并扩大邻域，合成50/500/5000个节点
+
+合成数据按规模缓存在--data-dir中，第二次运行直接复用。
+
+    python -m bench.suite --output bench_results.json
+    python -m bench.suite --pages page1 --students 1000 10000
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from unittest import mock
+
+import streamlit as st
+from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.fake_lke import FakeLKEServer  # noqa: E402
+from leaderboard.ledger import DEFAULT_COURSE, PointLedger  # noqa: E402
+from leaderboard.sample import SEMESTER_END, SEMESTER_START  # noqa: E402
+from tutor.connection import BackgroundLoop  # noqa: E402
+from tutor.token_cache import TokenCache  # noqa: E402
+
+PAGES = ["page1", "page2", "page3"]
+TIMEOUT = 600
+
+_SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾萧田董潘袁蔡蒋余于杜叶程"
+_GIVEN = "子涵欣怡梓轩浩然雨桐思远佳琪宇航诗雅俊杰可馨博文梦瑶一鸣语嫣晨曦清怡德毅婉莹紫艳奕佳"
+_ACTIVITIES = ["课堂提问", "小组展示", "课后作业", "机器人实训", "知识竞赛"]
+
+
+class DeltaMeter:
+    """统计重跑期间进入ForwardMsgQueue的delta消息字节数"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    @contextlib.contextmanager
+    def patch(self):
+        enqueue = ForwardMsgQueue.enqueue
+
+        def counting_enqueue(queue, msg):
+            if msg.WhichOneof("type") == "delta":
+                self.messages += 1
+                self.bytes += msg.ByteSize()
+            return enqueue(queue, msg)
+
+        with mock.patch.object(ForwardMsgQueue, "enqueue", counting_enqueue):
+            yield self
+
+    def reset(self):
+        self.messages = self.bytes = 0
+
+
+def measure(meter, name, action):
+    """执行一次重跑，返回耗时、内存和消息字节数"""
+    meter.reset()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    at = action()
+    wall = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "step": name,
+        "wall_ms": round(wall * 1000, 1),
+        "peak_kb": round((peak - before) / 1024, 1),
+        "retained_kb": round((current - before) / 1024, 1),
+        "delta_messages": meter.messages,
+        "delta_bytes": meter.bytes,
+        "exceptions": [e.value for e in at.exception],
+    }
+
+
+def _fresh_caches():
+    # 各页面的数据都放在st.cache_resource/st.cache_data中，换数据集前清空
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def _widget(elements, label):
+    return next(element for element in elements if element.label == label)
+
+
+def make_points_db(path, n_students, class_size=100, events_per_student=3, seed=0):
+    """合成n_students名学生的积点数据库，按class_size人分班"""
+    rng = random.Random(seed)
+    ledger = PointLedger(path)
+    students = []
+    for i in range(n_students):
+        name = rng.choice(_SURNAMES) + "".join(rng.sample(_GIVEN, 2))
+        students.append((f"B{i:06d}", name, rng.choice(["男", "女"]), f"{i // class_size + 1}班",
+                         DEFAULT_COURSE, f"第{i % class_size // 5 + 1}组"))
+    ledger.upsert_students(students)
+    start = SEMESTER_START.timestamp()
+    span = SEMESTER_END.timestamp() - start
+    events = []
+    for student_id, _, _, class_id, course_id, group in students:
+        for _ in range(rng.randint(0, 2 * events_per_student)):
+            events.append((start + rng.random() * span, student_id, group, rng.randint(1, 3),
+                           rng.choice(_ACTIVITIES), class_id, course_id))
+    events.sort(key=lambda event: event[0])
+    ledger.append_events(events)
+    ledger.close()
+
+
+def make_graph(path, n_nodes, n_topics=4, n_groups=6, edges_per_node=2, seed=0):
+    """合成n_nodes个节点的知识图谱，节点平均分到各主题，边只连同一主题的节点"""
+    rng = random.Random(seed)
+    topics = [{"name": f"主题{t + 1}", "description": f"**主题{t + 1}**的合成知识点"} for t in range(n_topics)]
+    nodes = [{
+        "id": f"知识点{i}",
+        "group": f"分组{i % n_groups + 1}",
+        "title": f"知识点{i}",
+        "description": f"合成知识点{i}的说明",
+        "topics": [topics[i % n_topics]["name"]],
+    } for i in range(n_nodes)]
+    edges = []
+    for i in range(n_nodes):
+        for _ in range(edges_per_node):
+            j = rng.randrange(i % n_topics, n_nodes, n_topics)
+            if j != i:
+                edges.append({"from": nodes[i]["id"], "to": nodes[j]["id"], "label": "关联"})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"topics": topics, "nodes": nodes, "edges": edges}, f, ensure_ascii=False)
+
+
+def _dataset(data_dir, name, make, *args):
+    path = os.path.join(data_dir, name)
+    if not os.path.exists(path):
+        make(path, *args)
+    return path
+
+
+def bench_page1(meter, data_dir, n_students):
+    path = _dataset(data_dir, f"points_{n_students}.db", make_points_db, n_students)
+    _fresh_caches()
+    steps = []
+    with mock.patch.dict(os.environ, {"POINTS_DB": path}):
+        at = AppTest.from_file(os.path.join(ROOT, "pages", "page1.py"), default_timeout=TIMEOUT)
+        steps.append(measure(meter, "first_run", at.run))
+        steps.append(measure(meter, "rerun", at.run))
+        steps.append(measure(meter, "select_class", lambda: _widget(at.selectbox, "班级").select_index(1).run()))
+        for query in ("z", "zh", "zha", "zhan"):
+            steps.append(measure(meter, f"search:{query}", lambda: _widget(at.text_input, "🔍 搜索学生").input(query).run()))
+        steps.append(measure(meter, "clear_search", lambda: _widget(at.text_input, "🔍 搜索学生").input("").run()))
+        steps.append(measure(meter, "next_page", lambda: at.number_input(key="students_page").increment().run()))
+        steps.append(measure(meter, "sort_by_name", lambda: at.selectbox(key="students_sort").set_value("姓名").run()))
+        steps.append(measure(meter, "past_date",
+                             lambda: at.date_input[0].set_value(date(2025, 5, 1)).run()))
+        steps.append(measure(meter, "school_wide", lambda: _widget(at.selectbox, "班级").set_value("全校").run()))
+    return steps
+
+
+def bench_page2(meter, data_dir, questions):
+    _fresh_caches()
+    server_loop = BackgroundLoop("fake-lke")
+    server = FakeLKEServer(answer_chars=400, chunk_delay=0.005)
+    url = server_loop.submit(server.start()).result()
+    steps = []
+    # 页面从当前目录读取config.json，在临时目录中运行，指向模拟服务
+    with tempfile.TemporaryDirectory() as workdir, contextlib.chdir(workdir), \
+            mock.patch.object(TokenCache, "acquire", lambda self, *args, **kwargs: "bench-token"):
+        with open("config.json", "w") as f:
+            json.dump({"ws_url": url, "answer_cache_path": os.path.join(workdir, "answer_cache.json")}, f)
+        at = AppTest.from_file(os.path.join(ROOT, "pages", "page2.py"), default_timeout=TIMEOUT)
+        steps.append(measure(meter, "first_run", at.run))
+        at.session_state["token_key"] = ("bench-id", "bench-key", "bench-app", "123456", "ap-guangzhou")
+        at.session_state["session_id"] = "bench-session"
+        for i in range(questions):
+            steps.append(measure(meter, f"ask:{i}", lambda: at.chat_input[0].set_value(f"问题{i}").run()))
+        # 新会话中重复第一个问题，命中答案缓存（同一会话中的追问不使用缓存）
+        at.session_state["session_id"] = "bench-session-2"
+        at.session_state["session_turns"] = 0
+        steps.append(measure(meter, "ask_cached", lambda: at.chat_input[0].set_value("问题0").run()))
+        steps.append(measure(meter, "rerun", at.run))
+    server_loop.submit(server.stop()).result()
+    return steps
+
+
+def bench_page3(meter, data_dir, n_nodes):
+    path = _dataset(data_dir, f"graph_{n_nodes}.json", make_graph, n_nodes)
+    _fresh_caches()
+    steps = []
+    with mock.patch.dict(os.environ, {"KNOWLEDGE_GRAPH_PATH": path}):
+        at = AppTest.from_file(os.path.join(ROOT, "pages", "page3.py"), default_timeout=TIMEOUT)
+        steps.append(measure(meter, "first_run", at.run))
+        steps.append(measure(meter, "rerun", at.run))
+        steps.append(measure(meter, "next_topic", lambda: at.radio[0].set_value(at.radio[0].options[1]).run()))
+        steps.append(measure(meter, "node_size", lambda: _widget(at.slider, "节点大小").set_value(50).run()))
+        steps.append(measure(meter, "edge_width", lambda: _widget(at.slider, "边的粗细").set_value(4).run()))
+        steps.append(measure(meter, "first_topic", lambda: at.radio[0].set_value(at.radio[0].options[0]).run()))
+        steps.append(measure(meter, "search_concept", lambda: _widget(at.text_input, "🔍 搜索知识点").input("知识点1").run()))
+        steps.append(measure(meter, "hops:2", lambda: _widget(at.slider, "邻域跳数").set_value(2).run()))
+        steps.append(measure(meter, "hops:3", lambda: _widget(at.slider, "邻域跳数").set_value(3).run()))
+    return steps
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pages=PAGES, students=(1000, 10000, 100000), nodes=(50, 500, 5000), questions=3,
+        data_dir=os.path.join(ROOT, ".cache", "bench")):
+    os.makedirs(data_dir, exist_ok=True)
+    report = {
+        "revision": _git_revision(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "streamlit": st.__version__,
+        "pages": {},
+    }
+    meter = DeltaMeter()
+    tracemalloc.start()
+    try:
+        with meter.patch():
+            if "page1" in pages:
+                report["pages"]["page1"] = {str(n): bench_page1(meter, data_dir, n) for n in students}
+            if "page2" in pages:
+                report["pages"]["page2"] = {str(questions): bench_page2(meter, data_dir, questions)}
+            if "page3" in pages:
+                report["pages"]["page3"] = {str(n): bench_page3(meter, data_dir, n) for n in nodes}
+    finally:
+        tracemalloc.stop()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="三个页面的重跑性能基准")
+    parser.add_argument("--pages", nargs="+", choices=PAGES, default=PAGES)
+    parser.add_argument("--students", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, ".cache", "bench"))
+    parser.add_argument("--output", help="结果写入的JSON文件，默认输出到标准输出")
+    args = parser.parse_args()
+    report = run(args.pages, args.students, args.nodes, args.questions, args.data_dir)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
@@ -0,0 +1 @@
+"""各页面共用的页面设置、样式、运行指标和名称搜索"""
@@ -0,0 +1,27 @@
+// 样式组件：把theme.css以<link>的形式加到应用页面的<head>，每个浏览器标签页只加一次
+(function () {
+  function send(type, data) {
+    var message = { isStreamlitMessage: true, type: type };
+    for (var k in data) {
+      message[k] = data[k];
+    }
+    window.parent.postMessage(message, "*");
+  }
+
+  var head = window.parent.document.head;
+  if (!head.querySelector("link#app-theme")) {
+    var link = window.parent.document.createElement("link");
+    link.id = "app-theme";
+    link.rel = "stylesheet";
+    link.href = new URL("theme.css", document.baseURI).href;
+    head.appendChild(link);
+  }
+
+  window.addEventListener("message", function (event) {
+    if (event.data && event.data.type === "streamlit:render") {
+      send("streamlit:setFrameHeight", { height: 0 });
+    }
+  });
+
+  send("streamlit:componentReady", { apiVersion: 1 });
+})();
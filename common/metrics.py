@@ -0,0 +1,180 @@
+"""进程内的计数器和耗时直方图
+
+各页面在热点路径上计时（助教的取Token、连接、认证、首帧和完整回答，知识图谱的
+构建和渲染，排行榜的聚合），数据按指标名和标签累积在进程内，可以在“运行指标”
+页面查看，也可以用Prometheus文本格式导出。
+
+设置环境变量APP_METRICS=1时才记录；关闭时timer()返回同一个空的上下文管理器，
+inc()/observe()直接返回，开销只有一次布尔判断。设置APP_METRICS_PORT时app.py
+另外启动一个HTTP导出端点（/metrics），默认只监听本机，APP_METRICS_HOST可指定其他
+地址。
+"""
+
+import bisect
+import contextlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("APP_METRICS", "") not in ("", "0")
+
+# 默认的耗时桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NOOP = contextlib.nullcontext()
+
+# 导出端点启动失败的原因，在“运行指标”页面显示
+exporter_error = None
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个是+Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """按桶估计分位数，落在+Inf桶时返回最大的桶上界"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class Registry:
+    """按(指标名, 标签)累积计数器和直方图"""
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """每个指标一行：名称、标签、类型、次数、总和、均值和估计的p50/p95"""
+        with self._lock:
+            rows = [{"指标": name, "标签": _format_labels(labels), "类型": "counter",
+                     "次数": value, "总和": value, "均值": None, "p50": None, "p95": None}
+                    for (name, labels), value in sorted(self._counters.items())]
+            for (name, labels), h in sorted(self._histograms.items()):
+                rows.append({"指标": name, "标签": _format_labels(labels), "类型": "histogram",
+                             "次数": h.count, "总和": round(h.sum, 4), "均值": round(h.sum / h.count, 4),
+                             "p50": h.quantile(0.5), "p95": h.quantile(0.95)})
+        return rows
+
+    def render_prometheus(self):
+        """Prometheus文本格式"""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), h in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, n in zip((*h.buckets, "+Inf"), h.counts):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {h.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+REGISTRY = Registry()
+
+
+def inc(name, amount=1, **labels):
+    if ENABLED:
+        REGISTRY.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    if ENABLED:
+        REGISTRY.observe(name, value, **labels)
+
+
+@contextlib.contextmanager
+def _timer(name, labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - started, **labels)
+
+
+def timer(name, **labels):
+    """统计with块的耗时（秒），关闭时不做任何事"""
+    if not ENABLED:
+        return _NOOP
+    return _timer(name, labels)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """在后台线程中提供/metrics，返回HTTP服务器；端口无法绑定时记下原因并返回None"""
+    global exporter_error
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as e:
+        exporter_error = f"无法在 {host}:{port} 启动指标导出端点：{e}"
+        return None
+    exporter_error = None
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
@@ -0,0 +1,95 @@
+"""名称搜索索引，排行榜的学生、小组搜索和知识图谱的知识点搜索共用
+
+每个名称生成若干检索键：归一化后的原文、全拼和拼音首字母（安装了pypinyin时）。
+所有检索键的单字和二元组建成倒排索引，查询时求二元组倒排表的交集得到候选，
+再按字面子串核对，不把输入当作正则表达式。结果按匹配程度排序：完全相同、
+前缀匹配、其余子串匹配，同一档内保持建索引时的顺序。
+"""
+
+import functools
+import unicodedata
+
+import numpy as np
+
+
+@functools.lru_cache(maxsize=None)
+def _pinyin():
+    """pypinyin导入时要加载词典，较慢，第一次建索引时才导入"""
+    try:
+        from pypinyin import lazy_pinyin
+    except ImportError:  # 没有pypinyin时只支持按原文搜索
+        return None
+    return lazy_pinyin
+
+
+def normalize_name(text):
+    """全角转半角、统一小写，并去掉空白"""
+    return "".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def _search_keys(name, pinyin=True):
+    norm = normalize_name(name)
+    keys = [norm]
+    lazy_pinyin = _pinyin() if pinyin else None
+    if lazy_pinyin is not None:
+        syllables = lazy_pinyin(norm)
+        full = "".join(syllables)
+        initials = "".join(syllable[0] for syllable in syllables)
+        keys.extend(key for key in (full, initials) if key not in keys)
+    return keys
+
+
+def _grams(text):
+    if len(text) < 2:
+        return set(text)
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class NameIndex:
+    """按名称搜索，返回匹配项的key；pinyin=False时只按原文检索（如较长的说明文字）"""
+
+    def __init__(self, keys, names, pinyin=True):
+        self.keys = np.asarray(keys, dtype=object)
+        self._search_keys = [_search_keys(str(name), pinyin) for name in names]
+        postings = {}
+        for i, search_keys in enumerate(self._search_keys):
+            for key in search_keys:
+                for gram in _grams(key) | set(key):
+                    postings.setdefault(gram, []).append(i)
+        # 同一条目的多个检索键可能含有相同的字，去重后保持升序
+        self._postings = {gram: np.unique(ids) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, query, limit=None):
+        """返回排好序的匹配key数组"""
+        query = normalize_name(query)
+        if not query:
+            return self.keys[:limit]
+        candidates = None
+        # 从最短的倒排表开始求交集
+        for ids in sorted((self._postings.get(gram) for gram in _grams(query)),
+                          key=lambda ids: -1 if ids is None else len(ids)):
+            if ids is None:
+                return self.keys[:0]
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            if not len(candidates):
+                return self.keys[:0]
+
+        ranked = []
+        for i in candidates:
+            best = None
+            for key in self._search_keys[i]:
+                if key == query:
+                    best = 0
+                    break
+                if key.startswith(query):
+                    best = 1 if best is None else min(best, 1)
+                elif query in key and best is None:
+                    best = 2
+            if best is not None:
+                ranked.append((best, i))
+        ranked.sort()
+        hits = np.fromiter((i for _, i in ranked), dtype=np.int64, count=len(ranked))
+        return self.keys[hits[:limit]]
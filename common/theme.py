@@ -0,0 +1,24 @@
+"""全站的页面设置和样式表
+
+页面设置只在app.py中设置一次，各页面的标题和图标由st.Page提供。样式表放在
+frontend/目录下作为组件静态资源提供，组件把它以<link>挂到应用页面上，浏览器缓存
+后每次重跑只传输一个空的组件消息，不再重发整段<style>、重建样式节点。
+"""
+
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+_component = components.declare_component("app_theme", path=_FRONTEND_DIR)
+
+
+def configure_page():
+    """全站的页面设置，必须是app.py中的第一个Streamlit调用"""
+    st.set_page_config(layout="wide", initial_sidebar_state="expanded")
+
+
+def apply_theme():
+    """挂载全站样式表，参数不变时组件不会重新加载"""
+    _component(key="app_theme", default=None)
@@ -0,0 +1 @@
+"""课程知识图谱的数据存储与渲染组件"""
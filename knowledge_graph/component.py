@@ -0,0 +1,66 @@
+"""轻量的知识图谱渲染组件
+
+vis-network运行时放在frontend/目录下，作为Streamlit组件的静态资源提供，浏览器
+缓存后每次重跑只需传输图谱的节点、边和选项JSON，不再传输整份独立HTML。
+"""
+
+import os
+
+import streamlit.components.v1 as components
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+_component = components.declare_component("knowledge_graph", path=_FRONTEND_DIR)
+
+# 与create_knowledge_graph中pyvis生成的选项保持一致
+_BASE_OPTIONS = {
+    "configure": {"enabled": False},
+    "edges": {"color": {"inherit": True}, "smooth": {"enabled": True, "type": "dynamic"}},
+    "interaction": {"dragNodes": True, "hideEdgesOnDrag": False, "hideNodesOnDrag": False},
+}
+
+_FORCE_ATLAS = {
+    "enabled": True,
+    "solver": "forceAtlas2Based",
+    "forceAtlas2Based": {
+        "gravitationalConstant": -50,
+        "centralGravity": 0.01,
+        "springLength": 100,
+        "springConstant": 0.08,
+        "damping": 0.4,
+        "avoidOverlap": 0.5,
+    },
+    "stabilization": {"enabled": True, "fit": True, "iterations": 1000, "updateInterval": 50},
+}
+
+
+def graph_payload(view, node_size=30, edge_width=2, show_labels=True, positions=None, focus=None):
+    """把子图转成vis-network的节点、边和选项，focus节点放大并加粗边框"""
+    nodes = []
+    for node in view.nodes:
+        item = {
+            "id": node["id"],
+            "label": node["id"] if show_labels else "",
+            "title": f"{node['title']}<br><br>{node['description']}",
+            "group": node["group"],
+            "size": node_size,
+            "shape": "dot",
+            "font": {"color": "#000000"},
+        }
+        if positions:
+            item["x"], item["y"] = positions[node["id"]]
+            item["physics"] = False
+        if node["id"] == focus:
+            item["size"] = node_size * 1.5
+            item["borderWidth"] = 3
+        nodes.append(item)
+    edges = [
+        {"from": edge["from"], "to": edge["to"], "label": edge.get("label", ""), "width": edge_width}
+        for edge in view.edges
+    ]
+    options = dict(_BASE_OPTIONS, physics={"enabled": False} if positions else _FORCE_ATLAS)
+    return {"nodes": nodes, "edges": edges, "options": options}
+
+
+def knowledge_graph(payload, height=600, key=None):
+    """在页面中绘制知识图谱"""
+    return _component(height=height, key=key, default=None, **payload)
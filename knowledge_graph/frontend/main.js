@@ -0,0 +1,56 @@
+// 知识图谱组件：从Streamlit接收节点、边和选项的JSON，用vis-network绘制
+(function () {
+  var container = document.getElementById("graph");
+  var network = null;
+  var lastArgs = null;
+
+  function send(type, data) {
+    var message = { isStreamlitMessage: true, type: type };
+    for (var k in data) {
+      message[k] = data[k];
+    }
+    window.parent.postMessage(message, "*");
+  }
+
+  // 节点说明中含有HTML时转成元素，悬停提示才能正确换行
+  function withHtmlTitles(nodes) {
+    return nodes.map(function (node) {
+      if (typeof node.title === "string" && node.title.indexOf("<") !== -1) {
+        var element = document.createElement("div");
+        element.innerHTML = node.title;
+        return Object.assign({}, node, { title: element });
+      }
+      return node;
+    });
+  }
+
+  function render(args) {
+    // 参数未变化时不重建网络，保留用户的拖动和缩放
+    var serialized = JSON.stringify(args);
+    if (serialized === lastArgs) {
+      return;
+    }
+    lastArgs = serialized;
+
+    container.style.height = args.height + "px";
+    var data = {
+      nodes: new vis.DataSet(withHtmlTitles(args.nodes)),
+      edges: new vis.DataSet(args.edges),
+    };
+    if (network === null) {
+      network = new vis.Network(container, data, args.options);
+    } else {
+      network.setOptions(args.options);
+      network.setData(data);
+    }
+    send("streamlit:setFrameHeight", { height: args.height });
+  }
+
+  window.addEventListener("message", function (event) {
+    if (event.data && event.data.type === "streamlit:render") {
+      render(event.data.args);
+    }
+  });
+
+  send("streamlit:componentReady", { apiVersion: 1 });
+})();
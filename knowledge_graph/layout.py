@@ -0,0 +1,136 @@
+"""服务端预计算的知识图谱布局
+
+用向量化的NumPy实现Fruchterman-Reingold力导向布局，把节点坐标随图谱一起发给
+浏览器并关闭vis-network的物理模拟，客户端不必再迭代到稳定。已经算过的节点坐标会
+作为后续布局的初始位置，切换主题时公共节点保持不动。主题的布局一直保留；知识点
+邻域这类数量不定的子图按LRU只保留最近的若干个。
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# 分块计算斥力，限制n×n中间数组的内存
+_BLOCK = 512
+
+
+def force_layout(n, src, dst, init=None, fixed=None, iterations=150, temperature=0.1, seed=0):
+    """返回n×2的坐标数组
+
+    src/dst为边的端点下标；init为n×2的初始坐标，其中NaN的行随机初始化；fixed为
+    布尔掩码，对应节点保持初始坐标不动。没有固定节点时结果归一化到[-1, 1]。
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-1, 1, size=(n, 2))
+    if init is not None:
+        known = ~np.isnan(init).any(axis=1)
+        pos[known] = init[known]
+    if fixed is not None and not fixed.any():
+        fixed = None
+    if n <= 1:
+        return pos if fixed is not None else np.zeros((n, 2))
+
+    k = np.sqrt(4.0 / n)
+    for step in range(iterations):
+        disp = np.zeros_like(pos)
+
+        # 斥力：k²/d，沿节点间连线方向
+        x = pos[:, 0].astype(np.float32)
+        y = pos[:, 1].astype(np.float32)
+        for start in range(0, n, _BLOCK):
+            dx = x[start:start + _BLOCK, None] - x[None, :]
+            dy = y[start:start + _BLOCK, None] - y[None, :]
+            weight = dx * dx
+            weight += dy * dy
+            np.maximum(weight, 1e-6, out=weight)
+            np.divide(k * k, weight, out=weight)
+            disp[start:start + _BLOCK, 0] += (dx * weight).sum(axis=1)
+            disp[start:start + _BLOCK, 1] += (dy * weight).sum(axis=1)
+
+        # 引力：d²/k，沿边方向
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt(np.einsum("ij,ij->i", delta, delta))[:, None]
+            force = delta * dist / k
+            np.subtract.at(disp, src, force)
+            np.add.at(disp, dst, force)
+
+        if fixed is not None:
+            disp[fixed] = 0
+
+        # 位移受温度限制，温度线性下降
+        t = temperature * (1 - step / iterations)
+        length = np.sqrt(np.einsum("ij,ij->i", disp, disp))[:, None]
+        pos += disp / np.maximum(length, 1e-9) * np.minimum(length, t)
+
+    if fixed is None:
+        pos -= pos.mean(axis=0)
+        pos /= max(np.abs(pos).max(), 1e-9)
+    return pos
+
+
+class LayoutCache:
+    """按子图缓存节点坐标，已知坐标作为后续布局的种子"""
+
+    def __init__(self, scale=None, iterations=150, max_recent=64):
+        self.scale = scale
+        self.iterations = iterations
+        self.max_recent = max_recent
+        self._known = {}             # 节点id -> (x, y)，归一化坐标，最多为图谱的节点数
+        self._pinned = {}            # 主题 -> {节点id: (x, y)}，像素坐标
+        self._recent = OrderedDict()  # 其他子图，按LRU淘汰
+        self._lock = threading.Lock()
+
+    def positions(self, key, view, pin=False):
+        """返回子图的像素坐标{节点id: (x, y)}
+
+        pin为True的key（如主题）一直缓存，其余的只保留最近使用的max_recent个。锁只在
+        查找和写入缓存时持有，力导向布局在锁外计算，不阻塞其他会话的查找。
+        """
+        store = view.store
+        ids = [store.nodes[i]["id"] for i in view.node_ids]
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            init = np.array([self._known.get(node_id, (np.nan, np.nan)) for node_id in ids], dtype=float)
+            if self.scale is None:
+                self.scale = 60 * np.sqrt(len(store.nodes))
+            scale = self.scale
+
+        local = np.full(len(store.nodes), -1, dtype=np.int64)
+        local[view.node_ids] = np.arange(len(ids))
+        src = local[store.edge_src[view.edge_ids]]
+        dst = local[store.edge_dst[view.edge_ids]]
+        seeded = ~np.isnan(init).any(axis=1)
+        # 大部分节点已有位置时只做少量微调
+        iterations = self.iterations // 3 if seeded.mean() > 0.5 else self.iterations
+        temperature = 0.03 if seeded.any() else 0.1
+        # 已有节点保持位置不变，只放置新节点
+        pos = force_layout(len(ids), src, dst, init=init, fixed=seeded,
+                           iterations=iterations, temperature=temperature)
+        result = {node_id: (float(x * scale), float(y * scale)) for node_id, (x, y) in zip(ids, pos)}
+
+        with self._lock:
+            # 其他会话同时算好了同一个子图时，沿用先写入的结果
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            for node_id, (x, y) in zip(ids, pos):
+                self._known.setdefault(node_id, (float(x), float(y)))
+            if pin:
+                self._pinned[key] = result
+            else:
+                self._recent[key] = result
+                while len(self._recent) > self.max_recent:
+                    self._recent.popitem(last=False)
+            return result
+
+    def _lookup(self, key):
+        cached = self._pinned.get(key)
+        if cached is None:
+            cached = self._recent.get(key)
+            if cached is not None:
+                self._recent.move_to_end(key)
+        return cached
@@ -0,0 +1,28 @@
+"""知识点搜索索引
+
+名称（含全拼和拼音首字母）和说明文字各建一份倒排索引，启动后建一次。查询时名称
+匹配的知识点排在前面，其次是只在说明中出现查询词的知识点。
+"""
+
+import numpy as np
+
+from common.search import NameIndex
+
+
+class ConceptIndex:
+    """按名称和说明搜索知识点，返回节点下标"""
+
+    def __init__(self, nodes):
+        ids = np.arange(len(nodes))
+        self._names = NameIndex(ids, [node["id"] for node in nodes])
+        self._descriptions = NameIndex(
+            ids, [f"{node.get('title', '')} {node.get('description', '')}" for node in nodes], pinyin=False)
+
+    def __len__(self):
+        return len(self._names)
+
+    def search(self, query, limit=None):
+        names = self._names.search(query).astype(np.int64)
+        descriptions = self._descriptions.search(query).astype(np.int64)
+        hits = np.concatenate([names, descriptions[~np.isin(descriptions, names)]])
+        return hits[:limit]
@@ -0,0 +1,129 @@
+"""课程知识图谱的进程级数据存储
+
+图谱数据保存在data/knowledge_graph.json中，启动时加载一次并建立索引：按节点id、
+按分组、按主题的下标数组，以及出边/入边的CSR邻接数组。没有topics字段的节点和边
+属于所有主题。页面通过topic_view取得主题子图，只涉及该主题的k个节点和边；通过
+neighborhood取得某个知识点的k跳邻域，在CSR数组上逐层BFS，不构建图对象。
+"""
+
+import json
+import os
+
+import numpy as np
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "knowledge_graph.json")
+
+
+def _csr(src, dst, size):
+    """把边列表转成CSR：indptr[i]:indptr[i+1]为节点i的邻居，同时返回对应的边下标"""
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=size), out=indptr[1:])
+    return indptr, dst[order], order
+
+
+def _gather(indptr, values, rows):
+    """CSR中多行的内容拼接在一起，rows为行下标数组"""
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return values[:0]
+    # 每个元素在values中的位置：所在行的起点 + 行内偏移
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+    return values[offsets]
+
+
+class GraphView:
+    """图谱的一个子图，只持有节点和边在存储中的下标"""
+
+    __slots__ = ("store", "node_ids", "edge_ids")
+
+    def __init__(self, store, node_ids, edge_ids):
+        self.store = store
+        self.node_ids = node_ids
+        self.edge_ids = edge_ids
+
+    @property
+    def nodes(self):
+        return [self.store.nodes[i] for i in self.node_ids]
+
+    @property
+    def edges(self):
+        return [self.store.edges[i] for i in self.edge_ids]
+
+    def __len__(self):
+        return len(self.node_ids)
+
+
+class KnowledgeGraphStore:
+    """只读的知识图谱及其索引"""
+
+    def __init__(self, nodes, edges, topics):
+        self.nodes = nodes
+        self.edges = edges
+        self.topics = {topic["name"]: topic.get("description", "") for topic in topics}
+
+        # 按节点id、分组建立索引
+        self.node_index = {node["id"]: i for i, node in enumerate(nodes)}
+        groups = {}
+        for i, node in enumerate(nodes):
+            groups.setdefault(node["group"], []).append(i)
+        self.by_group = {group: np.array(ids, dtype=np.int64) for group, ids in groups.items()}
+
+        # 邻接数组
+        self.edge_src = np.array([self.node_index[e["from"]] for e in edges], dtype=np.int64)
+        self.edge_dst = np.array([self.node_index[e["to"]] for e in edges], dtype=np.int64)
+        size = len(nodes)
+        self.out_indptr, self.out_indices, self.out_edges = _csr(self.edge_src, self.edge_dst, size)
+        self.in_indptr, self.in_indices, self.in_edges = _csr(self.edge_dst, self.edge_src, size)
+
+        # 按主题建立节点和边的下标
+        self._topic_views = {}
+        for topic in self.topics:
+            node_mask = np.array([topic in node.get("topics", (topic,)) for node in nodes], dtype=bool)
+            edge_mask = np.array([topic in edge.get("topics", (topic,)) for edge in edges], dtype=bool)
+            if len(edges):
+                edge_mask &= node_mask[self.edge_src] & node_mask[self.edge_dst]
+            self._topic_views[topic] = GraphView(self, np.flatnonzero(node_mask), np.flatnonzero(edge_mask))
+
+    @classmethod
+    def load(cls, path=DATA_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["nodes"], data["edges"], data["topics"])
+
+    def topic_view(self, topic):
+        """主题子图，建立索引时已经算好"""
+        return self._topic_views[topic]
+
+    def neighborhood(self, i, k=1, max_nodes=None):
+        """节点i的k跳邻域（不区分边的方向）及其中的全部边
+
+        max_nodes限制子图大小：某一层加入后超过上限时，这一层只保留下标最小的若干个节点。
+        """
+        seen = np.zeros(len(self.nodes), dtype=bool)
+        seen[i] = True
+        frontier = np.array([i], dtype=np.int64)
+        size = 1
+        for _ in range(k):
+            found = np.concatenate([_gather(self.out_indptr, self.out_indices, frontier),
+                                    _gather(self.in_indptr, self.in_indices, frontier)])
+            frontier = np.unique(found[~seen[found]])
+            if max_nodes is not None:
+                frontier = frontier[:max(max_nodes - size, 0)]
+            if not len(frontier):
+                break
+            seen[frontier] = True
+            size += len(frontier)
+        node_ids = np.flatnonzero(seen)
+        # 邻域内节点的出边中，终点也在邻域内的边
+        edge_ids = _gather(self.out_indptr, self.out_edges, node_ids)
+        edge_ids = np.sort(edge_ids[seen[self.edge_dst[edge_ids]]])
+        return GraphView(self, node_ids, edge_ids)
+
+    def successors(self, i):
+        return self.out_indices[self.out_indptr[i]:self.out_indptr[i + 1]]
+
+    def predecessors(self, i):
+        return self.in_indices[self.in_indptr[i]:self.in_indptr[i + 1]]
@@ -0,0 +1 @@
+"""课程积分排行榜的数据层"""
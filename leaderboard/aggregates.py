@@ -0,0 +1,164 @@
+"""学生和小组积点的增量聚合
+
+聚合结果以NumPy数组保存在内存中，记录已经处理到的事件id（水位线）；每次同步
+只读取水位线之后新追加的事件并累加，不重新扫描整个账本。同一批事件还会加入
+按时间索引的流水，用来查询任意日期时的排行。小组统计按名册中的小组归属，对学生
+数组做一次向量化分组汇总得到，不单独记账。
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from leaderboard.timeline import PointTimeline
+from leaderboard.topk import top_k
+
+
+def group_stats(groups, points, events):
+    """按每名学生的小组汇总，groups中的缺失值表示未分组
+
+    返回小组表：累积积点、组员人数、平均积点、中位积点和参与率（有积点事件的
+    组员占比，百分数）。
+    """
+    codes, names = pd.factorize(pd.Series(groups, dtype=object), sort=True)
+    grouped = codes >= 0
+    codes = codes[grouped]
+    points = np.asarray(points, dtype=np.int64)[grouped]
+    events = np.asarray(events, dtype=np.int64)[grouped]
+    n = len(names)
+
+    members = np.bincount(codes, minlength=n)
+    totals = np.bincount(codes, weights=points, minlength=n).astype(np.int64)
+    active = np.bincount(codes, weights=events > 0, minlength=n)
+
+    # 中位数：按(小组, 积点)排序后取每组中间的一个或两个值
+    median = np.zeros(n)
+    if len(codes):
+        ordered = points[np.lexsort((points, codes))]
+        starts = np.concatenate([[0], np.cumsum(members)[:-1]])
+        median = (ordered[starts + (members - 1) // 2] + ordered[starts + members // 2]) / 2
+
+    safe = np.maximum(members, 1)
+    return pd.DataFrame({
+        "小组": np.asarray(names, dtype=object),
+        "累积积点": totals,
+        "组员人数": members,
+        "平均积点": np.round(totals / safe, 1),
+        "中位积点": median,
+        "参与率": np.round(active / safe * 100, 1),
+    })
+
+
+class LeaderboardAggregates:
+    """按学生累计积点和参与活动次数，shard为(班级, 课程)时只统计该分片"""
+
+    def __init__(self, ledger, shard=None):
+        self.ledger = ledger
+        self.shard = shard
+        self.watermark = 0
+        self._roster_version = None
+        self._students = pd.DataFrame(
+            columns=["student_id", "name", "gender", "class_id", "course_id", "group_name"])
+        self._student_index = pd.Index([])
+        self._student_points = np.zeros(0, dtype=np.int64)
+        self._student_events = np.zeros(0, dtype=np.int64)
+        self._student_timeline = PointTimeline()
+        self._lock = threading.Lock()
+
+    def sync(self):
+        """追上账本的最新状态，返回(名册版本, 水位线)作为缓存版本"""
+        with self._lock:
+            roster_version, last_id = self.ledger.version(self.shard)
+            if roster_version != self._roster_version:
+                self._load_roster()
+                self._roster_version = roster_version
+            if last_id > self.watermark:
+                events = self.ledger.events_since(self.watermark, self.shard)
+                if len(events):
+                    self._fold(events)
+                    self.watermark = int(events["event_id"].iloc[-1])
+            return self._roster_version, self.watermark
+
+    def _load_roster(self):
+        # 下标只追加不重排，已有的累计值和时间索引保持有效；不分片时同一学号的
+        # 多条选课记录只取第一条。名册中没有的学号（由事件补进来的）保留原来的行
+        students = self.ledger.students(self.shard).drop_duplicates("student_id")
+        self._student_index = _extend_index(self._student_index, students["student_id"])
+        kept = self._students[~self._students["student_id"].isin(students["student_id"])]
+        if len(kept):
+            students = pd.concat([students, kept], ignore_index=True)
+        self._students = (students.set_index("student_id").reindex(self._student_index)
+                          .rename_axis("student_id").reset_index())
+        self._student_points = _pad(self._student_points, len(self._student_index))
+        self._student_events = _pad(self._student_events, len(self._student_index))
+
+    def _fold(self, events):
+        # 只统计学生事件，未登记的学号以学号作为姓名补进名册
+        events = events[events["student_id"].notna()]
+        ids = events["student_id"].to_numpy()
+        points = events["points"].to_numpy(dtype=np.int64)
+        idx = self._student_index.get_indexer(ids)
+        if (idx < 0).any():
+            self._add_students(pd.unique(ids[idx < 0]))
+            idx = self._student_index.get_indexer(ids)
+        n = len(self._student_index)
+        self._student_points += np.bincount(idx, weights=points, minlength=n).astype(np.int64)
+        self._student_events += np.bincount(idx, minlength=n)
+        self._student_timeline.extend(events["ts"].to_numpy(), idx, points)
+
+    def _add_students(self, ids):
+        class_id, course_id = self.shard or (None, None)
+        extra = pd.DataFrame({"student_id": ids, "name": ids, "gender": None,
+                              "class_id": class_id, "course_id": course_id, "group_name": None})
+        self._students = pd.concat([self._students, extra], ignore_index=True)
+        self._student_index = pd.Index(self._students["student_id"])
+        self._student_points = _pad(self._student_points, len(self._student_index))
+        self._student_events = _pad(self._student_events, len(self._student_index))
+
+    def student_frame(self, as_of=None):
+        """学生排行表，按积点、活动次数降序；as_of为时间戳时只统计此前的事件"""
+        with self._lock:
+            frame = self._student_rows(slice(None), *self._student_totals(as_of))
+        return frame.sort_values(["积点", "参与活动次数"], ascending=False, kind="stable").reset_index(drop=True)
+
+    def top_students(self, k, as_of=None):
+        """积点前k名的学生，附带密集排名，不构造整张排行表"""
+        with self._lock:
+            points, events = self._student_totals(as_of)
+            order, ranks = top_k(points, events, k)
+            return self._student_rows(order, points, events).assign(排名=ranks)
+
+    def group_frame(self, as_of=None):
+        """按名册中的小组归属汇总学生积点"""
+        with self._lock:
+            points, events = self._student_totals(as_of)
+            groups = self._students["group_name"].to_numpy()
+        return group_stats(groups, points, events)
+
+    def _student_totals(self, as_of):
+        if as_of is None:
+            return self._student_points.copy(), self._student_events.copy()
+        return self._student_timeline.as_of(as_of, len(self._student_index))
+
+    def _student_rows(self, rows, points, events):
+        students = self._students.iloc[rows]
+        return pd.DataFrame({
+            "学号": students["student_id"].to_numpy(),
+            "姓名": students["name"].to_numpy(),
+            "小组": students["group_name"].to_numpy(),
+            "积点": points[rows],
+            "性别": students["gender"].to_numpy(),
+            "参与活动次数": events[rows],
+            "班级": students["class_id"].to_numpy(),
+        })
+
+
+def _extend_index(index, ids):
+    """在已有下标后面追加新出现的id"""
+    new = pd.Index(ids).difference(index, sort=False)
+    return index.append(new) if len(new) else index
+
+
+def _pad(values, size):
+    return np.concatenate([values, np.zeros(size - len(values), dtype=values.dtype)])
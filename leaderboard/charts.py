@@ -0,0 +1,111 @@
+"""排行榜图表模板
+
+图表的编码、比例尺、提示和样式用Altair构建并校验一次，转成Vega-Lite字典缓存；
+每次重跑只把数据交给st.vega_lite_chart，不再重复构建、校验和序列化整个图表。
+"""
+
+import altair as alt
+
+CHART_HEIGHT = 300
+
+# 各图表用到的列，只把这些列发给浏览器
+STUDENT_COLUMNS = ["排名", "姓名", "积点", "参与活动次数"]
+GROUP_COLUMNS = ["小组", "累积积点", "组员人数", "平均积点", "中位积点", "参与率"]
+
+_AXIS_CONFIG = dict(labelFontSize=11, titleFontSize=12, gridColor='#e2e8f0')
+
+_GROUP_TOOLTIP = [
+    alt.Tooltip('小组:N', title='小组'),
+    alt.Tooltip('累积积点:Q', title='累积积点'),
+    alt.Tooltip('组员人数:Q', title='组员人数'),
+    alt.Tooltip('平均积点:Q', title='平均积点'),
+    alt.Tooltip('中位积点:Q', title='中位积点'),
+    alt.Tooltip('参与率:Q', title='参与率(%)'),
+]
+
+
+def _to_spec(chart):
+    """转成不含数据的Vega-Lite字典，与st.altair_chart一样不套用Altair默认主题"""
+    with alt.theme.enable("none"):
+        spec = chart.to_dict()
+    spec.pop("data", None)
+    spec.pop("datasets", None)
+    return spec
+
+
+def student_bar_spec(height=CHART_HEIGHT):
+    """学生积点柱状图，按数据顺序（排名）排列"""
+    chart = alt.Chart().mark_bar(
+        cornerRadiusTopLeft=3,
+        cornerRadiusTopRight=3
+    ).encode(
+        x=alt.X('姓名:N', sort=None, axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('积点:Q', axis=alt.Axis(title='积点')),
+        color=alt.Color(
+            '积点:Q',
+            scale=alt.Scale(scheme='blues', domainMin=0),
+            legend=alt.Legend(title='积点')
+        ),
+        tooltip=[
+            alt.Tooltip('排名:Q', title='排名'),
+            alt.Tooltip('姓名:N', title='学生'),
+            alt.Tooltip('积点:Q', title='积点'),
+            alt.Tooltip('参与活动次数:Q', title='活动次数')
+        ]
+    ).properties(
+        width='container',
+        height=height
+    ).configure_view(
+        stroke=None
+    ).configure_axis(**_AXIS_CONFIG)
+    return _to_spec(chart)
+
+
+def group_pie_spec(height=CHART_HEIGHT):
+    """小组累积积点环形图"""
+    chart = alt.Chart().mark_arc(
+        innerRadius=50,
+        strokeWidth=1,
+        stroke='#ffffff'
+    ).encode(
+        theta=alt.Theta(field="累积积点", type="quantitative"),
+        color=alt.Color(field="小组", type="nominal", scale=alt.Scale(scheme='category10')),
+        tooltip=_GROUP_TOOLTIP
+    ).properties(
+        width='container',
+        height=height
+    ).configure_view(
+        stroke=None
+    )
+    return _to_spec(chart)
+
+
+def group_bar_spec(height=CHART_HEIGHT):
+    """小组积点对比条形图"""
+    chart = alt.Chart().mark_bar(
+        cornerRadiusTopLeft=3,
+        cornerRadiusTopRight=3
+    ).encode(
+        x=alt.X('小组:N', axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('累积积点:Q', axis=alt.Axis(title='累积积点')),
+        color=alt.Color(
+            '累积积点:Q',
+            scale=alt.Scale(scheme='greens', domainMin=0),
+            legend=alt.Legend(title='累积积点')
+        ),
+        tooltip=_GROUP_TOOLTIP
+    ).properties(
+        width='container',
+        height=height
+    ).configure_view(
+        stroke=None
+    ).configure_axis(**_AXIS_CONFIG)
+    return _to_spec(chart)
+
+
+def build_templates(height=CHART_HEIGHT):
+    return {
+        "students": student_bar_spec(height),
+        "group_pie": group_pie_spec(height),
+        "group_bar": group_bar_spec(height),
+    }
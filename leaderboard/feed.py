@@ -0,0 +1,56 @@
+"""账本的变更通知
+
+进程内只有一个后台线程定期读取账本的版本号，所有打开排行榜的页面共享这个版本；
+页面的局部刷新先比较版本，没有变化时直接命中缓存，不会每个观看者各查一次数据库。
+版本变化后第一个刷新的页面按水位线读取新增事件，其余页面命中新版本的缓存。
+"""
+
+import threading
+
+
+class ChangeFeed:
+    """账本版本的共享轮询"""
+
+    def __init__(self, ledger, interval=2.0):
+        self.ledger = ledger
+        self.interval = interval
+        self._version = ledger.version()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    @property
+    def version(self):
+        """最近一次读到的(名册版本, 最新事件id)"""
+        self._start()
+        return self._version
+
+    def poll(self):
+        """立即读取一次版本，本进程写入账本后调用可以不等下一轮"""
+        version = self.ledger.version()
+        with self._cond:
+            self._version = version
+        return version
+
+    def _start(self):
+        if self._thread is None:
+            with self._cond:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._poll_loop, name="ledger-feed", daemon=True)
+                    self._thread.start()
+
+    def _poll_loop(self):
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._stopped, self.interval):
+                    return
+            try:
+                self.poll()
+            except Exception:
+                # 数据库暂时不可用时等下一轮
+                pass
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
@@ -0,0 +1,207 @@
+"""积点记录的批量导入
+
+CSV和Excel(.xlsx)文件逐块读取，带有姓名、小组列时同时更新名册和小组归属；每块
+校验后在一个事务中写入账本。每行事件按内容和同样内容在文件中出现的次序计算
+row_hash，由账本的唯一索引去重：重复导入、改名后导入或在中间插入新行后再导入，
+已有的行都不会重复计分，文件中内容相同的两行仍然各记一次。
+导入在后台线程中进行，页面通过progress读取进度，完成后排行榜的聚合按水位线增量
+更新。
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+from leaderboard.ledger import DEFAULT_CLASS, DEFAULT_COURSE, EVENT_COLUMNS, to_timestamps
+
+CHUNK_ROWS = 5000
+
+# 每条事件至少要有时间、学号和积点
+REQUIRED_COLUMNS = ("时间", "学号", "积点")
+
+# 错误信息最多保留的条数
+_MAX_ERRORS = 20
+
+
+class InvalidImportFile(ValueError):
+    """文件缺少必需的列"""
+
+
+def _csv_chunks(path, chunk_rows):
+    for chunk in pd.read_csv(path, dtype=str, chunksize=chunk_rows, skipinitialspace=True):
+        yield chunk
+
+
+def _xlsx_chunks(path, chunk_rows):
+    from openpyxl import load_workbook
+
+    # 只读模式逐行读取，不把整个工作表载入内存
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+        batch = []
+        for row in rows:
+            if any(cell is not None for cell in row):
+                batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def count_rows(path):
+    """估计文件的数据行数，用于显示进度"""
+    if path.endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True)
+        try:
+            return max((workbook.active.max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
+    lines = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+    return max(lines - 1, 0)
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    """按块读取CSV或xlsx文件，每块为一个中文列名的DataFrame"""
+    if path.endswith(".xlsx"):
+        return _xlsx_chunks(path, chunk_rows)
+    return _csv_chunks(path, chunk_rows)
+
+
+def validate_chunk(chunk, first_row=2):
+    """校验并规范化一块数据，返回(事件行, 名册行, 错误信息)
+
+    first_row为这一块第一行在文件中的行号，用于错误提示。
+    """
+    chunk = chunk.rename(columns=lambda name: str(name).strip())
+    missing = [name for name in REQUIRED_COLUMNS if name not in chunk]
+    if missing:
+        raise InvalidImportFile(f"缺少必需的列：{'、'.join(missing)}")
+
+    frame = pd.DataFrame(index=chunk.index)
+    for name, field in EVENT_COLUMNS.items():
+        if name in chunk:
+            values = chunk[name]
+            if field not in ("ts", "points"):
+                values = values.astype("string").str.strip().replace("", pd.NA)
+            frame[field] = values
+        else:
+            frame[field] = pd.NA
+    frame["class_id"] = frame["class_id"].fillna(DEFAULT_CLASS)
+    frame["course_id"] = frame["course_id"].fillna(DEFAULT_COURSE)
+    frame["ts"] = pd.to_datetime(frame["ts"], errors="coerce")
+    frame["points"] = pd.to_numeric(frame["points"], errors="coerce")
+
+    bad = (
+        frame["ts"].isna()
+        | frame["points"].isna()
+        | (frame["points"] % 1 != 0)
+        | frame["student_id"].isna()
+    )
+    errors = [f"第{first_row + i}行：时间、学号或积点无效"
+              for i in (bad.to_numpy().nonzero()[0][:_MAX_ERRORS])]
+    frame = frame[~bad]
+
+    ts = to_timestamps(frame["ts"])
+    student_ids, group_names, activity, class_id, course_id = (
+        _objects(frame[field]) for field in ("student_id", "group_name", "activity", "class_id", "course_id"))
+    points = frame["points"].astype("int64").tolist()
+    events = list(zip(ts, student_ids, group_names, points, activity, class_id, course_id))
+
+    roster = []
+    if "姓名" in chunk:
+        names = _objects(chunk.loc[frame.index, "姓名"].astype("string").str.strip())
+        genders = _objects(chunk.loc[frame.index, "性别"]) if "性别" in chunk else [None] * len(frame)
+        seen = set()
+        for sid, name, gender, cls, course, group in zip(
+                student_ids, names, genders, class_id, course_id, group_names):
+            if sid is None or name is None or (sid, cls, course) in seen:
+                continue
+            seen.add((sid, cls, course))
+            roster.append((sid, name, None if gender is None else str(gender), cls, course, group))
+    return events, roster, errors
+
+
+def _objects(series):
+    """转成Python对象列表，缺失值为None"""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+class ImportJob:
+    """在后台线程中把一个文件导入账本，delete_file为True时导入结束后删除文件（如上传的临时文件）"""
+
+    def __init__(self, ledger, path, name=None, chunk_rows=CHUNK_ROWS, delete_file=False):
+        self.ledger = ledger
+        self.path = path
+        self.name = name or path
+        self.chunk_rows = chunk_rows
+        self.delete_file = delete_file
+        self.total_rows = None
+        self.rows_read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    @property
+    def progress(self):
+        if self.done:
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(self.rows_read / self.total_rows, 0.99)
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self.run, name="point-import", daemon=True)
+        self._thread.start()
+        return self
+
+    def run(self):
+        try:
+            self.total_rows = count_rows(self.path)
+            seen = Counter()  # 各内容在文件中已经出现的次数，跨块累计
+            for chunk in read_chunks(self.path, self.chunk_rows):
+                events, roster, errors = validate_chunk(chunk, first_row=self.rows_read + 2)
+                if roster:
+                    self.ledger.upsert_students(roster)
+                inserted = self.ledger.import_events(events, seen) if events else 0
+                self.rows_read += len(chunk)
+                self.inserted += inserted
+                self.duplicates += len(events) - inserted
+                self.invalid += len(chunk) - len(events)
+                if len(self.errors) < _MAX_ERRORS:
+                    self.errors.extend(errors[:_MAX_ERRORS - len(self.errors)])
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            if self.delete_file:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+            self.finished_at = time.time()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,323 @@
+"""课程积点流水账本
+
+每次加减积点记为一条事件，按自增id顺序追加到SQLite中；学生名册单独成表，记录
+每名学生所在的小组。事件和名册都带有班级、课程字段，按(班级, 课程)分片查询；名册
+以(学号, 班级, 课程)为键，同一名学生可以同时选修多门课程。追加事件时在同一个事务
+中累加每名学生的积点汇总表，没有加载到内存的分片直接从汇总表取前K名，只有查询
+历史日期时才扫描事件。流水文件的导入见
+leaderboard.importer，文件使用中文列名。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "points.db")
+
+DEFAULT_CLASS = "默认班级"
+DEFAULT_COURSE = "RPA财务机器人课程"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS students (
+    student_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    gender TEXT,
+    class_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    group_name TEXT,
+    PRIMARY KEY (student_id, class_id, course_id)
+);
+CREATE TABLE IF NOT EXISTS point_events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    student_id TEXT,
+    group_name TEXT,
+    points INTEGER NOT NULL,
+    activity TEXT,
+    class_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    row_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS student_points (
+    class_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    first_event INTEGER NOT NULL,
+    PRIMARY KEY (class_id, course_id, student_id)
+);
+CREATE INDEX IF NOT EXISTS point_events_shard ON point_events (class_id, course_id, event_id);
+CREATE INDEX IF NOT EXISTS students_shard ON students (class_id, course_id);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('roster_version', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('student_points_built', 0);
+"""
+
+# 把event_id大于?的学生事件累加进积点汇总表
+_ACCUMULATE_POINTS = """
+INSERT INTO student_points (class_id, course_id, student_id, points, events, first_event)
+    SELECT class_id, course_id, student_id, SUM(points), COUNT(*), MIN(event_id) FROM point_events
+    WHERE event_id > ? AND student_id IS NOT NULL GROUP BY class_id, course_id, student_id
+ON CONFLICT (class_id, course_id, student_id) DO UPDATE SET
+    points = points + excluded.points, events = events + excluded.events
+"""
+
+# 早期创建的账本没有row_hash列和学生的小组列
+_MIGRATIONS = """
+CREATE UNIQUE INDEX IF NOT EXISTS point_events_row_hash ON point_events (row_hash);
+"""
+
+# 早期的名册以学号为主键，选修第二门课程会覆盖第一门，重建为(学号, 班级, 课程)主键
+_REKEY_STUDENTS = """
+ALTER TABLE students RENAME TO students_old;
+CREATE TABLE students (
+    student_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    gender TEXT,
+    class_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    group_name TEXT,
+    PRIMARY KEY (student_id, class_id, course_id)
+);
+INSERT INTO students (student_id, name, gender, class_id, course_id, group_name)
+    SELECT student_id, name, gender, class_id, course_id, group_name FROM students_old ORDER BY rowid;
+DROP TABLE students_old;
+CREATE INDEX IF NOT EXISTS students_shard ON students (class_id, course_id);
+"""
+
+# 流水文件的中文列名 -> 账本字段
+EVENT_COLUMNS = {
+    "时间": "ts",
+    "学号": "student_id",
+    "小组": "group_name",
+    "积点": "points",
+    "活动": "activity",
+    "班级": "class_id",
+    "课程": "course_id",
+}
+
+
+def row_content(row):
+    """事件内容的规范化文本，不含文件名和行号"""
+    ts, student_id, group_name, points, activity, class_id, course_id = row
+    return "\x1f".join((f"{float(ts):.3f}", student_id or "", group_name or "", str(int(points)),
+                        activity or "", class_id, course_id))
+
+
+def row_hash(content, occurrence=0):
+    """导入事件的摘要：内容加上同样内容在文件中已经出现过的次数
+
+    同一文件中两条内容相同的事件（如同一天两次课堂提问各加1分）摘要不同，都会记入；
+    重新导入、改名或在中间插入新行后，原有的行摘要不变，按唯一索引跳过。第一次出现
+    的摘要只由内容决定，与早期按内容去重的账本兼容。
+    """
+    text = content if occurrence == 0 else f"{content}\x1f{occurrence}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def to_timestamps(values):
+    """日期时间列转成Unix时间戳列表，不带时区的时间按本地时间处理"""
+    return [value.to_pydatetime().timestamp() for value in pd.to_datetime(values)]
+
+
+class PointLedger:
+    """积点事件账本，事件只追加不修改"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(point_events)")}
+            if "row_hash" not in columns:
+                self._conn.execute("ALTER TABLE point_events ADD COLUMN row_hash TEXT")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(students)")}
+            if "group_name" not in columns:
+                self._conn.execute("ALTER TABLE students ADD COLUMN group_name TEXT")
+            primary_key = [row[1] for row in self._conn.execute("PRAGMA table_info(students)") if row[5]]
+            if primary_key == ["student_id"]:
+                self._conn.executescript(_REKEY_STUDENTS)
+            self._conn.executescript(_MIGRATIONS)
+            # 汇总表建立之前的事件一次性补进来
+            built = self._conn.execute("SELECT value FROM meta WHERE key = 'student_points_built'").fetchone()[0]
+            if not built:
+                self._conn.execute("DELETE FROM student_points")
+                self._conn.execute(_ACCUMULATE_POINTS, (0,))
+                self._conn.execute("UPDATE meta SET value = 1 WHERE key = 'student_points_built'")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def version(self, shard=None):
+        """返回(名册版本, 最新事件id)，任一变化说明聚合结果需要更新；shard为(班级, 课程)"""
+        where, params = _shard_filter(shard)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT (SELECT value FROM meta WHERE key = 'roster_version'),"
+                f" (SELECT COALESCE(MAX(event_id), 0) FROM point_events WHERE {where})",
+                params,
+            ).fetchone()
+        return int(row[0]), int(row[1])
+
+    def shards(self):
+        """名册中出现过的(班级, 课程)"""
+        with self._lock:
+            return [tuple(row) for row in self._conn.execute(
+                "SELECT DISTINCT class_id, course_id FROM students ORDER BY 2, 1")]
+
+    def is_empty(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM students LIMIT 1").fetchone() is None
+
+    def upsert_students(self, rows):
+        """写入名册，rows为(学号, 姓名, 性别, 班级, 课程, 小组)
+
+        同一学号在不同的(班级, 课程)下各有一条选课记录；性别、小组为空时保留原值。
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO students (student_id, name, gender, class_id, course_id, group_name)"
+                " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (student_id, class_id, course_id) DO UPDATE SET"
+                " name = excluded.name, gender = COALESCE(excluded.gender, gender),"
+                " group_name = COALESCE(excluded.group_name, group_name)",
+                rows,
+            )
+            self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'roster_version'")
+
+    def append_events(self, rows):
+        """在一个事务中追加事件，rows为(时间戳, 学号, 小组, 积点, 活动, 班级, 课程)
+
+        课堂上实时记录的事件不去重，返回新增的条数。
+        """
+        with self._lock, self._conn:
+            last_id = self._last_event_id()
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT INTO point_events (ts, student_id, group_name, points, activity, class_id, course_id)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            inserted = self._conn.total_changes - before
+            if inserted:
+                self._conn.execute(_ACCUMULATE_POINTS, (last_id,))
+            return inserted
+
+    def import_events(self, rows, seen):
+        """在一个事务中追加从文件导入的事件，返回实际新增的条数
+
+        seen为Counter，记录本文件中各内容已经出现的次数，分块导入同一个文件时传入同一个
+        对象；已经导入过的事件按row_hash跳过。
+        """
+        hashed = []
+        for row in rows:
+            content = row_content(row)
+            hashed.append(tuple(row) + (row_hash(content, seen[content]),))
+            seen[content] += 1
+        with self._lock, self._conn:
+            last_id = self._last_event_id()
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO point_events"
+                " (ts, student_id, group_name, points, activity, class_id, course_id, row_hash)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                hashed,
+            )
+            inserted = self._conn.total_changes - before
+            if inserted:
+                self._conn.execute(_ACCUMULATE_POINTS, (last_id,))
+            return inserted
+
+    def _last_event_id(self):
+        # 先取得写锁再读最大id，其他连接不能在读取和插入之间追加事件
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM point_events").fetchone()[0]
+
+    def students(self, shard=None):
+        where, params = _shard_filter(shard)
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT student_id, name, gender, class_id, course_id, group_name FROM students"
+                f" WHERE {where} ORDER BY rowid", self._conn, params=params)
+
+    def events_since(self, event_id, shard=None):
+        """返回id大于event_id的事件，按id排序"""
+        where, params = _shard_filter(shard)
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT event_id, ts, student_id, group_name, points FROM point_events"
+                f" WHERE {where} AND event_id > ? ORDER BY event_id",
+                self._conn,
+                params=params + (event_id,),
+            )
+
+    def top_students(self, shard, k, as_of=None):
+        """一个分片积点前k名的学生，用于没有加载到内存的分片
+
+        当前排行读积点汇总表，as_of为时间戳时才扫描该分片的事件。与内存中的聚合一致：
+        名册中没有事件的学生记0分，有事件但未登记的学号以学号作为姓名；并列时按名册
+        顺序，未登记的学号按第一次出现的顺序排在名册之后。
+        """
+        totals, totals_params = self._totals_query(shard, as_of)
+        roster_where, roster_params = _shard_filter(shard, "s.")
+        with self._lock:
+            frame = pd.read_sql_query(
+                f"WITH totals AS ({totals})"
+                " SELECT s.student_id AS 学号, s.name AS 姓名, s.group_name AS 小组,"
+                " COALESCE(t.points, 0) AS 积点, s.gender AS 性别, COALESCE(t.events, 0) AS 参与活动次数,"
+                " s.class_id AS 班级, s.rowid AS _order"
+                f" FROM students s LEFT JOIN totals t ON t.student_id = s.student_id WHERE {roster_where}"
+                " UNION ALL"
+                " SELECT t.student_id, t.student_id, NULL, t.points, NULL, t.events, ?,"
+                " (SELECT COALESCE(MAX(rowid), 0) FROM students) + t.first_event"
+                f" FROM totals t WHERE t.student_id NOT IN (SELECT s.student_id FROM students s WHERE {roster_where})"
+                " ORDER BY 积点 DESC, 参与活动次数 DESC, _order LIMIT ?",
+                self._conn,
+                params=totals_params + roster_params + (shard[0],) + roster_params + (k,),
+            )
+        return frame.drop(columns="_order")
+
+    def student_totals(self, shard, as_of=None):
+        """一个分片名册中每名学生的积点和事件数，没有事件的学生为0；as_of为时间戳时才扫描事件"""
+        totals, totals_params = self._totals_query(shard, as_of)
+        where, params = _shard_filter(shard, "s.")
+        with self._lock:
+            return pd.read_sql_query(
+                f"WITH totals AS ({totals})"
+                " SELECT s.student_id, s.group_name, COALESCE(t.points, 0) AS points,"
+                " COALESCE(t.events, 0) AS events"
+                f" FROM students s LEFT JOIN totals t ON t.student_id = s.student_id"
+                f" WHERE {where} ORDER BY s.rowid",
+                self._conn,
+                params=totals_params + params,
+            )
+
+    @staticmethod
+    def _totals_query(shard, as_of):
+        """分片内每个学号的(积点, 事件数, 第一条事件id)：当前值读汇总表，历史值扫描事件"""
+        where, params = _shard_filter(shard)
+        if as_of is None:
+            return (f"SELECT student_id, points, events, first_event FROM student_points WHERE {where}",
+                    params)
+        # 只统计as_of之前的事件，但之后才出现的学号也要列出（0分），与内存中的聚合一致
+        return ("SELECT student_id, SUM(CASE WHEN ts < ? THEN points ELSE 0 END) AS points,"
+                " SUM(CASE WHEN ts < ? THEN 1 ELSE 0 END) AS events, MIN(event_id) AS first_event"
+                f" FROM point_events WHERE {where} AND student_id IS NOT NULL GROUP BY student_id",
+                (as_of, as_of) + params)
+
+def _shard_filter(shard, prefix=""):
+    """返回分片过滤条件和参数，shard为None时不过滤"""
+    if shard is None:
+        return "1", ()
+    return f"{prefix}class_id = ? AND {prefix}course_id = ?", tuple(shard)
@@ -0,0 +1,30 @@
+"""排行表的服务端分页和排序
+
+排序只计算一次下标顺序（稳定排序，缺失值排在最后），之后每次翻页只按下标取出
+一页的行，发给浏览器的数据量与页大小成正比，与名册大小无关。
+"""
+
+import math
+
+import numpy as np
+
+
+def sort_order(frame, column=None, ascending=True):
+    """返回按column排序后的行位置，column为None时保持原顺序"""
+    if column is None:
+        return np.arange(len(frame))
+    values = frame[column].reset_index(drop=True)
+    return values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+
+
+def page_count(n_rows, page_size):
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def page_rows(frame, order, page, page_size):
+    """取出第page页（从1开始）的行，索引为行在排序结果中的序号（从1开始）"""
+    start = (page - 1) * page_size
+    positions = order[start:start + page_size]
+    rows = frame.iloc[positions]
+    rows.index = np.arange(start + 1, start + 1 + len(positions))
+    return rows
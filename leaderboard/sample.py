@@ -0,0 +1,74 @@
+"""示例积点数据
+
+原来页面中的11名学生，积点拆成若干次活动事件，时间分布在一个学期内；再补齐各
+小组的其余组员（还没有积点），组员人数与原来的6个小组一致。示例数据只写入单独的
+演示账本（设置环境变量POINTS_DEMO=1时使用），不会混进真实的积点账本。
+"""
+
+import os
+import random
+from datetime import datetime
+
+from leaderboard.ledger import DB_PATH, DEFAULT_CLASS, DEFAULT_COURSE
+
+DEMO_DB_PATH = os.path.join(os.path.dirname(DB_PATH), "demo_points.db")
+
+SEMESTER_START = datetime(2025, 3, 3)
+SEMESTER_END = datetime(2025, 7, 4)
+
+_STUDENTS = [
+    # 姓名, 积点, 性别, 参与活动次数, 小组
+    ("陈德毅", 11, "男", 5, "第6组"),
+    ("李欣谣", 7, "女", 4, "第3组"),
+    ("李洪静", 6, "女", 3, "第1组"),
+    ("白婉莹", 6, "女", 3, "第6组"),
+    ("陈怡琳", 6, "女", 3, "第2组"),
+    ("胡晨曦", 5, "女", 2, "第5组"),
+    ("孙子涵", 4, "女", 2, "第3组"),
+    ("程佳媛", 3, "女", 1, "第4组"),
+    ("孟清怡", 3, "女", 1, "第2组"),
+    ("王奕佳", 2, "女", 1, "第1组"),
+    ("程紫艳", 2, "女", 1, "第5组"),
+]
+
+# 小组, 组员人数
+_GROUPS = [("第1组", 5), ("第2组", 4), ("第3组", 6), ("第4组", 5), ("第5组", 4), ("第6组", 6)]
+
+_OTHER_MEMBERS = [
+    ("张雨桐", "女"), ("刘思远", "男"), ("杨梓萱", "女"), ("黄俊杰", "男"), ("赵欣然", "女"),
+    ("吴佳琪", "女"), ("周子轩", "男"), ("徐诗涵", "女"), ("马一鸣", "男"), ("朱可欣", "女"),
+    ("郭雅婷", "女"), ("何宇航", "男"), ("高梦瑶", "女"), ("林浩然", "男"), ("罗子墨", "女"),
+    ("郑佳怡", "女"), ("谢博文", "男"), ("韩雪莹", "女"), ("唐语嫣", "女"),
+]
+
+_ACTIVITIES = ["课堂提问", "小组展示", "课后作业", "机器人实训", "知识竞赛"]
+
+
+def _split(total, parts):
+    """把total拆成parts个尽量平均的正整数"""
+    base, extra = divmod(total, parts)
+    return [base + 1 if i < extra else base for i in range(parts)]
+
+
+def seed_sample(ledger, seed=0):
+    rng = random.Random(seed)
+    start = SEMESTER_START.timestamp()
+    span = SEMESTER_END.timestamp() - start
+
+    students = [(f"2023{i + 1:03d}", name, gender, DEFAULT_CLASS, DEFAULT_COURSE, group)
+                for i, (name, _, gender, _, group) in enumerate(_STUDENTS)]
+    # 按小组补齐其余组员
+    others = iter(_OTHER_MEMBERS)
+    for group, size in _GROUPS:
+        for _ in range(size - sum(1 for *_, g in _STUDENTS if g == group)):
+            name, gender = next(others)
+            students.append((f"2023{len(students) + 1:03d}", name, gender, DEFAULT_CLASS, DEFAULT_COURSE, group))
+    ledger.upsert_students(students)
+
+    events = []
+    for (student_id, *_, group), (_, points, _, times, _) in zip(students, _STUDENTS):
+        for part in _split(points, times):
+            events.append((start + rng.random() * span, student_id, group, part,
+                           rng.choice(_ACTIVITIES), DEFAULT_CLASS, DEFAULT_COURSE))
+    events.sort(key=lambda event: event[0])
+    ledger.append_events(events)
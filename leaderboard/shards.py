@@ -0,0 +1,96 @@
+"""按(班级, 课程)分片的排行榜
+
+每个分片有自己的增量聚合，第一次查看时才从账本加载，按LRU只保留最近查看的几个
+分片，内存随实际查看的分片数增长。全校排行由各班级分片的前K名合并得到：已加载的
+分片直接用内存中的聚合，其余分片在数据库中汇总前K名，不加载到内存。
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from leaderboard.aggregates import LeaderboardAggregates, group_stats
+from leaderboard.topk import top_k
+
+
+class ShardedLeaderboard:
+    """分片聚合的LRU缓存"""
+
+    def __init__(self, ledger, max_shards=8):
+        self.ledger = ledger
+        self.max_shards = max_shards
+        self._shards = OrderedDict()  # (班级, 课程) -> LeaderboardAggregates
+        self._lock = threading.Lock()
+
+    def shards(self):
+        return self.ledger.shards()
+
+    def courses(self):
+        return sorted({course for _, course in self.shards()})
+
+    def classes(self, course_id):
+        return [class_id for class_id, course in self.shards() if course == course_id]
+
+    @property
+    def loaded(self):
+        with self._lock:
+            return list(self._shards)
+
+    def get(self, shard):
+        """返回分片的聚合，必要时加载并淘汰最久未查看的分片"""
+        shard = tuple(shard)
+        with self._lock:
+            aggregates = self._shards.get(shard)
+            if aggregates is not None:
+                self._shards.move_to_end(shard)
+            else:
+                aggregates = self._shards[shard] = LeaderboardAggregates(self.ledger, shard)
+                while len(self._shards) > self.max_shards:
+                    self._shards.popitem(last=False)
+        aggregates.sync()
+        return aggregates
+
+    def _peek(self, shard):
+        # 只取已经加载的分片，不改变LRU顺序
+        with self._lock:
+            return self._shards.get(shard)
+
+    def school_top_students(self, course_id, k, as_of=None):
+        """合并各班级的前k名，得到一门课程的全校前k名"""
+        parts = []
+        for class_id in self.classes(course_id):
+            shard = (class_id, course_id)
+            aggregates = self._peek(shard)
+            if aggregates is not None:
+                aggregates.sync()
+                parts.append(aggregates.top_students(k, as_of).drop(columns="排名"))
+            else:
+                parts.append(self.ledger.top_students(shard, k, as_of))
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return pd.DataFrame(columns=["学号", "姓名", "小组", "积点", "性别", "参与活动次数", "班级", "排名"])
+        merged = pd.concat(parts, ignore_index=True)
+        order, ranks = top_k(merged["积点"].to_numpy(), merged["参与活动次数"].to_numpy(), k)
+        return merged.iloc[order].assign(排名=ranks).reset_index(drop=True)
+
+    def school_top_groups(self, course_id, k, as_of=None):
+        """各班级小组合并后按累积积点取前k名，小组名前加班级"""
+        parts = []
+        for class_id in self.classes(course_id):
+            shard = (class_id, course_id)
+            aggregates = self._peek(shard)
+            if aggregates is not None:
+                aggregates.sync()
+                part = aggregates.group_frame(as_of)
+            else:
+                totals = self.ledger.student_totals(shard, as_of)
+                part = group_stats(totals["group_name"].to_numpy(), totals["points"], totals["events"])
+            parts.append(part.assign(小组=class_id + "·" + part["小组"]))
+        if not parts:
+            return group_stats([], [], [])
+        merged = pd.concat(parts, ignore_index=True)
+        points = merged["累积积点"].to_numpy(dtype=np.int64)
+        order, _ = top_k(points, np.zeros(len(points), dtype=np.int64), k)
+        return merged.iloc[order].reset_index(drop=True)
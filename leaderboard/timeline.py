@@ -0,0 +1,73 @@
+"""按时间索引的积点流水
+
+事件按时间戳排序保存在NumPy数组中，每隔固定条数记录一次各学生（或小组）的累计
+积点和事件数作为检查点。查询某一时刻的排行时先二分查找时间戳的位置，再从最近的
+检查点开始只累加剩下不足一段的事件，不必扫描全部历史。
+"""
+
+import numpy as np
+
+
+class PointTimeline:
+    """一类对象（学生或小组）的时间索引，对象用稳定的整数下标表示"""
+
+    def __init__(self, checkpoint_every=4096):
+        self.checkpoint_every = checkpoint_every
+        self._ts = np.zeros(0, dtype=np.float64)
+        self._idx = np.zeros(0, dtype=np.int64)
+        self._points = np.zeros(0, dtype=np.int64)
+        # 第c个检查点为前c*checkpoint_every条事件的(累计积点, 事件数)，按需计算
+        self._checkpoints = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))]
+
+    def __len__(self):
+        return len(self._ts)
+
+    def extend(self, ts, idx, points):
+        """加入一批事件，时间早于已有事件时只作废插入位置之后的检查点"""
+        if not len(ts):
+            return
+        ts = np.asarray(ts, dtype=np.float64)
+        first = len(self._ts)
+        if first and ts.min() < self._ts[-1]:
+            first = int(np.searchsorted(self._ts, ts.min(), side="right"))
+        self._ts = np.concatenate([self._ts, ts])
+        self._idx = np.concatenate([self._idx, np.asarray(idx, dtype=np.int64)])
+        self._points = np.concatenate([self._points, np.asarray(points, dtype=np.int64)])
+        if first < len(self._ts) - len(ts) or not _is_sorted(ts):
+            order = np.argsort(self._ts, kind="stable")
+            self._ts, self._idx, self._points = self._ts[order], self._idx[order], self._points[order]
+        del self._checkpoints[first // self.checkpoint_every + 1:]
+
+    def as_of(self, timestamp, size):
+        """返回时间戳之前（不含）各对象的(累计积点, 事件数)，长度为size"""
+        end = int(np.searchsorted(self._ts, timestamp, side="left"))
+        c = end // self.checkpoint_every
+        points, counts = self._checkpoint(c)
+        start = c * self.checkpoint_every
+        idx = self._idx[start:end]
+        points = _pad(points, size) + np.bincount(idx, weights=self._points[start:end], minlength=size).astype(np.int64)
+        counts = _pad(counts, size) + np.bincount(idx, minlength=size)
+        return points, counts
+
+    def _checkpoint(self, c):
+        step = self.checkpoint_every
+        while len(self._checkpoints) <= c:
+            k = len(self._checkpoints) - 1
+            points, counts = self._checkpoints[k]
+            idx = self._idx[k * step:(k + 1) * step]
+            size = max(len(points), int(idx.max()) + 1 if len(idx) else 0)
+            points = _pad(points, size) + np.bincount(
+                idx, weights=self._points[k * step:(k + 1) * step], minlength=size).astype(np.int64)
+            counts = _pad(counts, size) + np.bincount(idx, minlength=size)
+            self._checkpoints.append((points, counts))
+        return self._checkpoints[c]
+
+
+def _is_sorted(values):
+    return bool((values[1:] >= values[:-1]).all())
+
+
+def _pad(values, size):
+    if len(values) >= size:
+        return values[:size]
+    return np.concatenate([values, np.zeros(size - len(values), dtype=values.dtype)])
@@ -0,0 +1,35 @@
+"""排行榜的前K名选择
+
+先按(积点, 参与活动次数)合成一个整数排序键，用argpartition在O(n)时间内选出前K名，
+只对这K行排序。键相同的行按原来的顺序排列，排名为密集排名（并列后不跳号）。
+"""
+
+import numpy as np
+
+
+def top_k(points, activities, k):
+    """返回(前K名的下标, 对应的密集排名)，按积点、活动次数降序"""
+    points = np.asarray(points, dtype=np.int64)
+    activities = np.asarray(activities, dtype=np.int64)
+    n = len(points)
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # 活动次数作为低位，积点相同时活动次数多的排前面
+    low = activities - activities.min()
+    key = (points - points.min()) * (int(low.max()) + 1) + low
+
+    if k < n:
+        threshold = np.partition(key, n - k)[n - k]
+        above = np.flatnonzero(key > threshold)
+        # 与第K名并列的行只取下标靠前的几个，结果与稳定排序一致
+        tied = np.flatnonzero(key == threshold)[:k - len(above)]
+        chosen = np.concatenate([above, tied])
+    else:
+        chosen = np.arange(n)
+
+    order = chosen[np.lexsort((chosen, -key[chosen]))]
+    sorted_keys = key[order]
+    ranks = np.concatenate([[1], 1 + np.cumsum(sorted_keys[1:] != sorted_keys[:-1])])
+    return order, ranks
@@ -1,138 +1,143 @@
 import streamlit as st
 import pandas as pd
-import altair as alt
-from datetime import datetime
-
-# 设置页面配置
-st.set_page_config(
-    page_title="班级同学课程得分排行榜",
-    page_icon="🏅",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# 自定义样式
-st.markdown("""
-<style>
-    /* 整体背景 */
-    .main {
-        background-color: #f8fafc;
-    }
-    
-    /* 卡片样式 */
-    .css-1r6slb0 {
-        background-color: #ffffff;
-        border-radius: 0.75rem;
-        padding: 1.5rem;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-        margin-bottom: 1.5rem;
-    }
-    
-    /* 标题样式 */
-    h1 {
-        color: #1e40af;
-        font-weight: 700;
-        margin-bottom: 1rem;
-    }
-    
-    h2 {
-        color: #334155;
-        font-weight: 600;
-        margin-bottom: 0.75rem;
-        border-bottom: 2px solid #e2e8f0;
-        padding-bottom: 0.5rem;
-    }
-    
-    /* 搜索框样式 */
-    .stTextInput input {
-        border-radius: 0.375rem;
-        border: 1px solid #cbd5e1;
-        padding: 0.5rem 0.75rem;
-        box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05);
-    }
-    
-    /* 图表容器 */
-    .vega-embed {
-        border-radius: 0.5rem;
-        overflow: hidden;
-    }
-    
-    /* 指标卡片 */
-    .css-1dp5vir {
-        background-color: #f1f5f9;
-        border-radius: 0.5rem;
-        padding: 0.75rem;
-        text-align: center;
-    }
-    
-    /* 页脚样式 */
-    .css-cio0dv {
-        text-align: center;
-        color: #64748b;
-        font-size: 0.875rem;
-        margin-top: 2rem;
-    }
-    
-    /* 表格样式 */
-    .stDataFrame {
-        border-radius: 0.5rem;
-        overflow: hidden;
-    }
-    
-    /* 滚动条样式 */
-    ::-webkit-scrollbar {
-        width: 6px;
-        height: 6px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: #f1f5f9;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: #94a3b8;
-        border-radius: 3px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: #64748b;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# 模拟数据
-def generate_sample_data():
-    """生成示例数据"""
-    # 学生个人积点数据
-    student_data = {
-        "姓名": ["陈德毅", "李欣谣", "李洪静", "白婉莹", "陈怡琳", 
-                 "胡晨曦", "孙子涵", "程佳媛", "孟清怡", "王奕佳", "程紫艳"],
-        "积点": [11, 7, 6, 6, 6, 5, 4, 3, 3, 2, 2],
-        "性别": ["男", "女", "女", "女", "女", "女", "女", "女", "女", "女", "女"],
-        "参与活动次数": [5, 4, 3, 3, 3, 2, 2, 1, 1, 1, 1]
-    }
-    df_students = pd.DataFrame(student_data)
-    
-    # 小组积点数据
-    group_data = {
-        "小组": ["第1组", "第2组", "第3组", "第4组", "第5组", "第6组"],
-        "累积积点": [8, 8, 11, 5, 8, 17],
-        "组员人数": [5, 4, 6, 5, 4, 6],
-        "平均积点": [round(8/5, 1), round(8/4, 1), round(11/6, 1), 
-                    round(5/5, 1), round(8/4, 1), round(17/6, 1)]
-    }
-    df_groups = pd.DataFrame(group_data)
-    
-    return df_students, df_groups
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from common import metrics
+from common.search import NameIndex
+from leaderboard.charts import GROUP_COLUMNS, STUDENT_COLUMNS, build_templates
+from leaderboard.feed import ChangeFeed
+from leaderboard.importer import ImportJob
+from leaderboard.ledger import DB_PATH, PointLedger
+from leaderboard.paging import page_count, page_rows, sort_order
+from leaderboard.sample import DEMO_DB_PATH, seed_sample
+from leaderboard.shards import ShardedLeaderboard
+from leaderboard.topk import top_k
+
+# 积点账本，进程内只打开一次；POINTS_DB可指定其他数据库（如压测数据）。设置POINTS_DEMO=1时
+# 使用单独的演示账本，为空时写入示例数据
+@st.cache_resource
+def get_ledger():
+    demo = os.environ.get("POINTS_DEMO", "") not in ("", "0")
+    ledger = PointLedger(os.environ.get("POINTS_DB", DEMO_DB_PATH if demo else DB_PATH))
+    if demo and ledger.is_empty():
+        seed_sample(ledger)
+    return ledger
+
+# 账本版本的共享轮询，所有观看者共用一个后台线程
+@st.cache_resource
+def get_change_feed():
+    return ChangeFeed(get_ledger())
+
+# 按(班级, 课程)分片的聚合，只保留最近查看的几个分片
+@st.cache_resource
+def get_leaderboard():
+    return ShardedLeaderboard(get_ledger())
+
+# 按账本版本和截止时间缓存排行表，账本没有新事件时重跑直接命中
+@st.cache_data(max_entries=16)
+def load_leaderboard(shard, version, as_of=None):
+    with metrics.timer("leaderboard_aggregate_seconds", view="class"):
+        aggregates = get_leaderboard().get(shard)
+        return aggregates.student_frame(as_of), aggregates.group_frame(as_of)
+
+# 全校排行由各班级的前N名合并得到
+@st.cache_data(max_entries=16)
+def load_school_leaderboard(course_id, version, k, as_of=None):
+    leaderboard = get_leaderboard()
+    with metrics.timer("leaderboard_aggregate_seconds", view="school"):
+        return (leaderboard.school_top_students(course_id, k, as_of),
+                leaderboard.school_top_groups(course_id, k, as_of))
+
+# 学生和小组的名称搜索索引，分片名册和学生人数不变时只建一次；只出现在事件中的学号
+# 由聚合补进排行表，不改变名册版本，所以还要按人数区分
+@st.cache_resource(max_entries=8)
+def get_name_indexes(shard, roster_version, n_students, _students, _groups):
+    return NameIndex(_students["学号"], _students["姓名"]), NameIndex(_groups["小组"], _groups["小组"])
+
+@st.cache_resource
+def get_chart_templates():
+    return build_templates()
+
+def top_rows(frame, k):
+    """取积点前k名，积点相同时活动次数多的在前，附带密集排名"""
+    order, ranks = top_k(frame["积点"].to_numpy(), frame["参与活动次数"].to_numpy(), k)
+    return frame.iloc[order].assign(排名=ranks)
+
+def search_rows(frame, column, index, query):
+    """按索引的搜索结果顺序取出匹配的行"""
+    return frame.iloc[pd.Index(frame[column]).get_indexer(index.search(query))]
+
+# 表格的排序顺序按数据版本和搜索条件缓存，翻页时不再重新排序
+@st.cache_data(max_entries=64)
+def table_order(cache_key, column, ascending, _frame):
+    return sort_order(_frame, column, ascending)
+
+def paged_table(frame, key, cache_key, columns, sort_by, page_size, column_config=None):
+    """服务端排序、分页的表格，每次重跑只把当前一页发给浏览器"""
+    sort_col, order_col, page_col = st.columns([2, 1, 1])
+    with sort_col:
+        sort_by = st.selectbox("排序", columns, index=columns.index(sort_by), key=f"{key}_sort")
+    with order_col:
+        descending = st.selectbox("顺序", ["降序", "升序"], key=f"{key}_order") == "降序"
+    pages = page_count(len(frame), page_size)
+    # 搜索或换页大小后总页数变少时，回到最后一页
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    with page_col:
+        page = st.number_input("页码", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+    order = table_order(cache_key, sort_by, not descending, frame)
+    st.dataframe(
+        page_rows(frame, order, page, page_size)[columns],
+        use_container_width=True,
+        column_config=column_config
+    )
+    st.caption(f"第{page}/{pages}页，共{len(frame)}行")
 
-# 获取数据
-df_students, df_groups = generate_sample_data()
+SCHOOL_WIDE = "全校"
+REFRESH_SECONDS = 5
+
+def start_import(uploaded):
+    """把上传的文件写到临时文件，在后台线程中导入，导入结束后由导入任务删除临时文件"""
+    suffix = os.path.splitext(uploaded.name)[1].lower()
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        shutil.copyfileobj(uploaded, f)
+    st.session_state.import_job = ImportJob(get_ledger(), f.name, name=uploaded.name, delete_file=True).start()
+    st.session_state.import_reported = False
+
+def show_import_progress():
+    """导入进度，导入进行中时每秒刷新一次"""
+    job = st.session_state.get("import_job")
+    if job is None:
+        return
+    st.progress(job.progress, text=f"{job.name}：已读取{job.rows_read}行")
+    if not job.done:
+        return
+    if job.error:
+        st.error(f"导入失败：{job.error}")
+    else:
+        st.success(f"新增{job.inserted}条，重复{job.duplicates}条，无效{job.invalid}条")
+    for message in job.errors:
+        st.caption(message)
+    # 完成后整页重跑一次，排行榜按水位线增量更新
+    if not st.session_state.import_reported:
+        st.session_state.import_reported = True
+        get_change_feed().poll()
+        st.rerun()
 
 # 侧边栏
 with st.sidebar:
     st.title("课程数据中心")
     st.markdown("---")
     
+    # 课程和班级选择，默认第一个班级；有两个以上班级时才提供合并各班级的“全校”
+    courses = get_leaderboard().courses()
+    selected_course = st.selectbox("课程", courses)
+    classes = get_leaderboard().classes(selected_course)
+    selected_class = st.selectbox("班级", classes + [SCHOOL_WIDE] if len(classes) >= 2 else classes)
+    
     # 日期选择器
     selected_date = st.date_input(
         "选择日期",
@@ -145,9 +150,23 @@ with st.sidebar:
     st.subheader("数据筛选")
     show_all_students = st.checkbox("显示全部学生", value=True)
     show_all_groups = st.checkbox("显示全部小组", value=True)
+    top_n = st.slider("排行显示人数", min_value=5, max_value=50, value=10, step=5)
+    page_size = st.selectbox("表格每页行数", [10, 20, 50, 100], index=1)
+    live_refresh = st.toggle("实时刷新", value=True, help=f"每{REFRESH_SECONDS}秒检查一次新积点")
     
     st.markdown("---")
     
+    # 教师导入Excel/CSV积点记录
+    with st.expander("导入积点记录"):
+        # 一次只进行一个导入，进行中时按钮不可用
+        import_job = st.session_state.get("import_job")
+        importing = import_job is not None and not import_job.done
+        uploaded = st.file_uploader("CSV或Excel文件", type=["csv", "xlsx"])
+        if st.button("开始导入", disabled=importing or uploaded is None) and not importing:
+            start_import(uploaded)
+            st.rerun()
+        st.fragment(show_import_progress, run_every=None if import_job is None or import_job.done else 1)()
+    
     # # 帮助信息
     # st.subheader("使用帮助")
     # st.markdown("""
@@ -156,175 +175,133 @@ with st.sidebar:
     # - 指标卡片显示实时统计信息
     # """)
 
+# 账本中还没有任何班级时，只保留侧边栏的导入
+if selected_class is None:
+    st.title("课程积分排行榜")
+    st.info("账本中还没有积点记录，请在侧边栏导入积点记录；设置环境变量 POINTS_DEMO=1 可查看示例数据。")
+    st.stop()
+
+# 获取数据，选择今天及以后时显示最新排行，否则统计到所选日期当天结束
+if selected_date >= datetime.now().date():
+    as_of = None
+else:
+    as_of = datetime.combine(selected_date + timedelta(days=1), datetime.min.time()).timestamp()
+
 # 页面标题
-st.title("RPA财务机器人课程积分排行榜")
+st.title(f"{selected_course}积分排行榜")
+if selected_class == SCHOOL_WIDE:
+    st.caption(f"全校视图合并各班级的前{top_n}名，统计只针对这{top_n}名，搜索请选择班级")
 # st.markdown(f"**数据更新日期**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 # st.markdown("---")
 
-# 设置固定高度
-CHART_HEIGHT = 300
-
-# 使用两列布局
-col1, col2 = st.columns([1, 1])
-
-# 第一列：学生积点TOP10
-with col1:
-    with st.container():
-        st.header("学生积点TOP10")
-        
-        # 创建搜索框
-        student_search = st.text_input("🔍 搜索学生", "")
-        
-        # 筛选数据 - 修复逻辑
-        if student_search:
-            filtered_students = df_students[df_students["姓名"].str.contains(student_search, case=False)]
-        else:
-            filtered_students = df_students
-        
-        # 创建柱状图
-        chart = alt.Chart(filtered_students).mark_bar(
-            cornerRadiusTopLeft=3,
-            cornerRadiusTopRight=3
-        ).encode(
-            x=alt.X('姓名:N', sort='-y', axis=alt.Axis(labelAngle=-45)),
-            y=alt.Y('积点:Q', axis=alt.Axis(title='积点')),
-            color=alt.Color(
-                '积点:Q', 
-                scale=alt.Scale(
-                    scheme='blues',
-                    domain=[0, df_students["积点"].max()]
-                ),
-                legend=alt.Legend(title='积点')
-            ),
-            tooltip=[
-                alt.Tooltip('姓名:N', title='学生'),
-                alt.Tooltip('积点:Q', title='积点'),
-                alt.Tooltip('参与活动次数:Q', title='活动次数')
-            ]
-        ).properties(
-            width='container',
-            height=CHART_HEIGHT
-        ).configure_view(
-            stroke=None
-        ).configure_axis(
-            labelFontSize=11,
-            titleFontSize=12,
-            gridColor='#e2e8f0'
-        )
-        
-        st.altair_chart(chart, use_container_width=True)
-        
-        # 数据统计
-        avg_points = filtered_students["积点"].mean()
-        max_points = filtered_students["积点"].max()
-        min_points = filtered_students["积点"].min()
-        
-        col1_stat, col2_stat, col3_stat = st.columns(3)
-        with col1_stat:
-            st.metric("平均积点", f"{avg_points:.1f}")
-        with col2_stat:
-            st.metric("最高积点", f"{max_points}")
-        with col3_stat:
-            st.metric("最低积点", f"{min_points}")
-        
-        # 显示筛选后的数据表格
-        st.dataframe(
-            filtered_students[["姓名", "积点", "参与活动次数"]], 
-            use_container_width=True, 
-            height=200
-        )
-        
-        # 显示筛选状态
-        if student_search:
-            st.caption(f"🔍 搜索结果: {len(filtered_students)}/{len(df_students)} 名学生")
-
-# 第二列：小组累积积点
-with col2:
-    with st.container():
-        st.header("小组累积积点")
-        
-        # 创建搜索框
-        group_search = st.text_input("🔍 搜索小组", "")
-        
-        # 筛选数据 - 修复逻辑
-        if group_search:
-            filtered_groups = df_groups[df_groups["小组"].str.contains(group_search, case=False)]
-        else:
-            filtered_groups = df_groups
-        
-        # 创建饼图
-        pie_chart = alt.Chart(filtered_groups).mark_arc(
-            innerRadius=50,
-            strokeWidth=1,
-            stroke='#ffffff'
-        ).encode(
-            theta=alt.Theta(field="累积积点", type="quantitative"),
-            color=alt.Color(
-                field="小组", 
-                type="nominal",
-                scale=alt.Scale(
-                    scheme='category10'
-                )
-            ),
-            tooltip=[
-                alt.Tooltip('小组:N', title='小组'),
-                alt.Tooltip('累积积点:Q', title='累积积点'),
-                alt.Tooltip('组员人数:Q', title='组员人数'),
-                alt.Tooltip('平均积点:Q', title='平均积点')
-            ]
-        ).properties(
-            width='container',
-            height=CHART_HEIGHT
-        ).configure_view(
-            stroke=None
-        )
-        
-        st.altair_chart(pie_chart, use_container_width=True)
-        
-        # 创建小组积点对比条形图
-        bar_chart = alt.Chart(filtered_groups).mark_bar(
-            cornerRadiusTopLeft=3,
-            cornerRadiusTopRight=3
-        ).encode(
-            x=alt.X('小组:N', axis=alt.Axis(labelAngle=-45)),
-            y=alt.Y('累积积点:Q', axis=alt.Axis(title='累积积点')),
-            color=alt.Color(
-                '累积积点:Q', 
-                scale=alt.Scale(
-                    scheme='greens',
-                    domain=[0, df_groups["累积积点"].max()]
-                ),
-                legend=alt.Legend(title='累积积点')
-            ),
-            tooltip=[
-                alt.Tooltip('小组:N', title='小组'),
-                alt.Tooltip('累积积点:Q', title='累积积点'),
-                alt.Tooltip('组员人数:Q', title='组员人数'),
-                alt.Tooltip('平均积点:Q', title='平均积点')
-            ]
-        ).properties(
-            width='container',
-            height=CHART_HEIGHT
-        ).configure_view(
-            stroke=None
-        ).configure_axis(
-            labelFontSize=11,
-            titleFontSize=12,
-            gridColor='#e2e8f0'
-        )
-        
-        st.altair_chart(bar_chart, use_container_width=True)
-        
-        # 显示筛选后的数据表格
-        st.dataframe(
-            filtered_groups, 
-            use_container_width=True, 
-            height=200
-        )
-        
-        # 显示筛选状态
-        if group_search:
-            st.caption(f"🔍 搜索结果: {len(filtered_groups)}/{len(df_groups)} 个小组")
+# 排行榜区域
+def leaderboard_view(selected_course, selected_class, top_n, page_size, as_of):
+    """排行榜的图表和表格，搜索、翻页时只重跑这一部分"""
+    # 共享的账本版本没有变化时，下面的数据全部命中缓存；记下渲染时的版本供实时刷新比较
+    version = get_change_feed().version
+    st.session_state.rendered_version = version
+    # 名称搜索索引只在输入搜索词时才构建；全校视图只有各班级的前N名，不提供搜索
+    school_wide = selected_class == SCHOOL_WIDE
+    if school_wide:
+        df_students, df_groups = load_school_leaderboard(selected_course, version, top_n, as_of)
+        name_indexes = None
+        data_key = (selected_course, version, top_n, as_of)
+    else:
+        shard = (selected_class, selected_course)
+        df_students, df_groups = load_leaderboard(shard, version, as_of)
+        name_indexes = lambda: get_name_indexes(shard, version[0], len(df_students), df_students, df_groups)
+        data_key = (shard, version, as_of)
+
+    # 图表模板只构建一次，重跑时只传数据
+    chart_templates = get_chart_templates()
+
+    # 使用两列布局
+    col1, col2 = st.columns([1, 1])
+
+    # 第一列：学生积点前N名
+    with col1:
+        with st.container():
+            st.header(f"学生积点TOP{top_n}")
+
+            # 创建搜索框
+            student_search = st.text_input("🔍 搜索学生", "", disabled=school_wide,
+                                           placeholder="请选择班级后搜索" if school_wide else "")
+            student_search = "" if school_wide else student_search
+
+            # 筛选数据，支持姓名、全拼和拼音首字母
+            if student_search:
+                filtered_students = search_rows(df_students, "学号", name_indexes()[0], student_search)
+            else:
+                filtered_students = df_students
+
+            # 柱状图只画前N名，按排名顺序排列
+            top_students = top_rows(filtered_students, top_n)
+            st.vega_lite_chart(top_students[STUDENT_COLUMNS], chart_templates["students"], use_container_width=True)
+
+            # 数据统计
+            avg_points = filtered_students["积点"].mean()
+            max_points = filtered_students["积点"].max()
+            min_points = filtered_students["积点"].min()
+
+            # 全校视图的统计只针对合并后的前N名
+            prefix = f"前{top_n}名" if school_wide else ""
+            col1_stat, col2_stat, col3_stat = st.columns(3)
+            with col1_stat:
+                st.metric(f"{prefix}平均积点", f"{avg_points:.1f}")
+            with col2_stat:
+                st.metric(f"{prefix}最高积点", f"{max_points}")
+            with col3_stat:
+                st.metric(f"{prefix}最低积点", f"{min_points}")
+
+            # 显示筛选后的数据表格，分页发送
+            paged_table(filtered_students, "students", ("students", data_key, student_search),
+                        ["姓名", "小组", "积点", "参与活动次数"], "积点", page_size)
+
+            # 显示筛选状态
+            if student_search:
+                st.caption(f"🔍 搜索结果: {len(filtered_students)}/{len(df_students)} 名学生")
+
+    # 第二列：小组累积积点
+    with col2:
+        with st.container():
+            st.header("小组累积积点")
+
+            # 创建搜索框
+            group_search = st.text_input("🔍 搜索小组", "", disabled=school_wide,
+                                         placeholder="请选择班级后搜索" if school_wide else "")
+            group_search = "" if school_wide else group_search
+
+            # 筛选数据
+            if group_search:
+                filtered_groups = search_rows(df_groups, "小组", name_indexes()[1], group_search)
+            else:
+                filtered_groups = df_groups
+
+            # 创建饼图
+            st.vega_lite_chart(filtered_groups[GROUP_COLUMNS], chart_templates["group_pie"], use_container_width=True)
+
+            # 创建小组积点对比条形图
+            st.vega_lite_chart(filtered_groups[GROUP_COLUMNS], chart_templates["group_bar"], use_container_width=True)
+
+            # 显示筛选后的数据表格，分页发送
+            paged_table(filtered_groups, "groups", ("groups", data_key, group_search),
+                        GROUP_COLUMNS, "累积积点", page_size,
+                        column_config={"参与率": st.column_config.NumberColumn(format="%.1f%%")})
+
+            # 显示筛选状态
+            if group_search:
+                st.caption(f"🔍 搜索结果: {len(filtered_groups)}/{len(df_groups)} 个小组")
+
+def watch_ledger():
+    """实时刷新：只比较共享的账本版本和上次渲染的版本，有新积点时才整页重跑，不渲染任何内容"""
+    if get_change_feed().version != st.session_state.get("rendered_version"):
+        st.rerun()
+
+st.fragment(leaderboard_view)(selected_course, selected_class, top_n, page_size, as_of)
+
+# 实时刷新只对当前排行有意义，查看历史日期时数据不会变化
+if live_refresh and as_of is None:
+    st.fragment(watch_ledger, run_every=REFRESH_SECONDS)()
 
 # 页脚
 st.markdown("---")
@@ -1,79 +1,62 @@
 import streamlit as st
-import asyncio
-import re
-import websockets
 import uuid
 import json
-from tencentcloud.common import credential
-from tencentcloud.common.profile.client_profile import ClientProfile
-from tencentcloud.common.profile.http_profile import HttpProfile
+import time
+from functools import partial
 from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
-from tencentcloud.lke.v20231130 import lke_client, models
-import ssl
-import certifi
 from datetime import datetime
+from common import metrics
+from tutor.answer_cache import AnswerCache, replay
+from tutor.connection import LKE_WS_URL, LKEError
+from tutor.gateway import GatewayBusy, TutorGateway
+from tutor.history import ChatHistory
+from tutor.stream import ReplyAssembler
+from tutor.token_cache import TokenCache
 
-# 配置SSL上下文
-ssl_context = ssl.create_default_context()
-ssl_context.load_verify_locations(certifi.where())
 
-# 页面配置
-st.set_page_config(
-    page_title="RPA财务机器人AI智能助教",
-    page_icon="🤖",
-    layout="wide"
-)
+@st.cache_resource
+def get_gateway(url):
+    """进程内共享的助教网关，所有会话复用少量已认证的上游连接"""
+    return TutorGateway(url)
 
-# 自定义样式
-st.markdown("""
-<style>
-    /* 整体背景 */
-    .main {
-        background-color: #f8fafc;
-    }
-    
-    /* 卡片样式 */
-    .css-1r6slb0 {
-        background-color: #ffffff;
-        border-radius: 0.75rem;
-        padding: 1.5rem;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-        margin-bottom: 1.5rem;
-    }
-    
-    /* 标题样式 */
-    h1 {
-        color: #1e40af;
-        font-weight: 700;
-        margin-bottom: 1rem;
-    }
-    
-    h2 {
-        color: #334155;
-        font-weight: 600;
-        margin-bottom: 0.75rem;
-        border-bottom: 2px solid #e2e8f0;
-        padding-bottom: 0.5rem;
-    }
-    
 
-   
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def get_answer_cache(path):
+    """进程内共享的答案缓存，重启后从磁盘恢复"""
+    return AnswerCache(path)
+
+
+@st.cache_resource
+def get_token_cache():
+    """进程内共享的Token缓存，同一组凭证的学生共用预取的Token"""
+    return TokenCache()
 
 
 # 初始化会话状态
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+if "history" not in st.session_state:
+    st.session_state.history = ChatHistory()
+
+# 已展开的归档页数
+if "history_pages_shown" not in st.session_state:
+    st.session_state.history_pages_shown = 0
 
-if "token" not in st.session_state:
-    st.session_state.token = ""
+# 获取Token所需的凭证，Token本身由进程级缓存按需发放
+if "token_key" not in st.session_state:
+    st.session_state.token_key = None
 
 if "session_id" not in st.session_state:
     st.session_state.session_id = ""
 
-if "response_buffer" not in st.session_state:
-    st.session_state.response_buffer = ""
+# 当前机器人会话中已经提问的次数，只有会话的第一个问题才使用答案缓存
+if "session_turns" not in st.session_state:
+    st.session_state.session_turns = 0
+
+# 会话的第一个问题由缓存回答时，机器人没有收到这一问一答，下一个问题发出时作为上文补上
+if "cached_context" not in st.session_state:
+    st.session_state.cached_context = None
+
+# 补充的上文中答案最多保留的字数
+CONTEXT_CHARS = 2000
 
 # 初始化配置状态
 if "config" not in st.session_state:
@@ -99,6 +82,8 @@ with st.sidebar:
     region = "ap-guangzhou"
     bot_app_key = st.text_input("AppKey", value=config.get("bot_app_key", ""))
     visitor_biz_id = "123456"
+    ws_url = config.get("ws_url", LKE_WS_URL)
+    answer_cache_path = config.get("answer_cache_path", ".cache/answer_cache.json")
     
     # 保存配置按钮
     # if st.button("保存配置"):
@@ -125,42 +110,32 @@ with st.sidebar:
         else:
             with st.spinner("正在获取Token..."):
                 try:
-                    # 实例化一个认证对象
-                    cred = credential.Credential(secret_id, secret_key)
-                    # 实例化一个http选项
-                    httpProfile = HttpProfile()
-                    httpProfile.endpoint = "lke.tencentcloudapi.com"
-
-                    # 实例化一个client选项
-                    clientProfile = ClientProfile()
-                    clientProfile.httpProfile = httpProfile
-                    # 实例化要请求产品的client对象
-                    client = lke_client.LkeClient(cred, region, clientProfile)
-
-                    # 实例化一个请求对象
-                    req = models.GetWsTokenRequest()
-                    params = {
-                        "Type": 5,  # API 访客
-                        "BotAppKey": bot_app_key,
-                        "VisitorBizId": visitor_biz_id
-                    }
-                    req.from_json_string(json.dumps(params))
-                    
-                    # 发送请求获取Token
-                    resp = client.GetWsToken(req)
-                    token_data = json.loads(resp.to_json_string())
-                    
-                    st.session_state.token = token_data.get("Token", "")
+                    token_key = (secret_id, secret_key, bot_app_key, visitor_biz_id, region)
                     st.session_state.session_id = str(uuid.uuid1())
+                    st.session_state.session_turns = 0
+                    st.session_state.cached_context = None
                     
-                    if st.session_state.token:
-                        st.success("Token获取成功！")
-                    else:
-                        st.error("Token获取失败！")
+                    # 从缓存取Token并提前建立连接，首个问题无需再握手认证
+                    get_gateway(ws_url).warm(
+                        token_key[:4], partial(get_token_cache().acquire, *token_key)
+                    ).result(timeout=30)
+                    st.session_state.token_key = token_key
+                    st.success("Token获取成功！")
                 except TencentCloudSDKException as err:
                     st.error(f"获取Token时出错: {str(err)}")
                 except KeyError as e:
                     st.error(f"配置缺少必要字段: {str(e)}")
+                except (LKEError, OSError, TimeoutError) as e:
+                    st.error(f"连接AI助教失败: {str(e)}")
+    
+    # 答案缓存命中情况
+    answer_cache = get_answer_cache(answer_cache_path)
+    if sum(answer_cache.stats.values()):
+        st.caption(
+            f"答案缓存命中率 {answer_cache.hit_rate:.0%}"
+            f"（精确 {answer_cache.stats['exact_hits']}，近似 {answer_cache.stats['near_hits']}，"
+            f"未命中 {answer_cache.stats['misses']}）"
+        )
 
 # 页面标题
 st.title("RPA财务机器人AI智能助教🤖")
@@ -173,18 +148,33 @@ st.markdown('''**您好，我是RPA财务机器人智能助教，如果你有任
 - 开发财务机器人需要哪些技术？
 - 怎么利用UiBot实现邮件客户端自动化？''')
 
-# 显示历史消息
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+def show_earlier_messages():
+    st.session_state.history_pages_shown += 1
+
+# 显示历史消息：更早的消息按页展开，最近的消息始终显示
+history = st.session_state.history
+if history.archived_pages:
+    if st.session_state.history_pages_shown < history.archived_pages:
+        st.button("显示更早的消息", on_click=show_earlier_messages)
+    elif history.dropped:
+        st.caption(f"更早的 {history.dropped} 条消息已清理")
+
+for index in reversed(range(min(st.session_state.history_pages_shown, history.archived_pages))):
+    for message in history.page(index):
+        with st.chat_message(message.role):
+            st.markdown(message.content)
+
+for message in history.live:
+    with st.chat_message(message.role):
+        st.markdown(message.content)
 
 # 处理用户输入
 if prompt := st.chat_input("请输入您的问题..."):
-    if not st.session_state.token:
+    if not st.session_state.token_key:
         st.error("请先在侧边栏获取Token！")
     else:
         # 添加用户消息到会话状态
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        history.append("user", prompt)
         
         # 显示用户消息
         with st.chat_message("user"):
@@ -195,98 +185,81 @@ if prompt := st.chat_input("请输入您的问题..."):
             message_placeholder = st.empty()
             message_placeholder.markdown("思考中...")
             
-            # 定义异步函数与WebSocket通信
-            async def send_message_and_receive(prompt):
-                url = f"wss://wss.lke.cloud.tencent.com/v1/qbot/chat/conn/?EIO=4&transport=websocket"
-                request_id = str(uuid.uuid1())
-                full_response = ""
-                received_segments = set()  # 用于记录已接收的响应段
-                
-                try:
-                    async with websockets.connect(url, ssl=ssl_context) as ws:
-                        # 接收连接响应
-                        response = await ws.recv()
-                        
-                        # 发送认证消息
-                        auth = {"token": st.session_state.token}
-                        auth_message = f"40{json.dumps(auth)}"
-                        await ws.send(auth_message)
-                        
-                        # 接收认证结果
-                        auth_response = await ws.recv()
-                        
-                        # 发送用户消息
-                        payload = {
-                            "payload": {
-                                "request_id": request_id,
-                                "session_id": st.session_state.session_id,
-                                "content": prompt,
-                            }
-                        }
-                        req_data = ["send", payload]
-                        send_data = f"42{json.dumps(req_data, ensure_ascii=False)}"
-                        await ws.send(send_data)
-                        
-                        # 接收回复
-                        while True:
-                            rsp = await ws.recv()
-                            
-                            if rsp == '2':
-                                # 收到心跳包，回复心跳
-                                await ws.send("3")
+            assembler = ReplyAssembler()
+            error_message = ""
+            received_segments = set()  # 用于记录已接收的响应段
+            token_key = st.session_state.token_key
+            token_provider = partial(get_token_cache().acquire, *token_key)
+            # 追问（如“继续”“详细说说”）的答案依赖上文，不读也不写缓存
+            first_turn = st.session_state.session_turns == 0
+            st.session_state.session_turns += 1
+            answer_cache = get_answer_cache(answer_cache_path)
+            cached_answer = answer_cache.get(token_key[2], prompt) if first_turn else None
+            
+            asked_at = time.perf_counter()
+            first_reply = True
+            metrics.inc("tutor_questions_total", source="upstream" if cached_answer is None else "cache")
+            try:
+                if cached_answer is not None:
+                    # 常见问题直接按流式节奏回放缓存的答案
+                    for content in replay(cached_answer):
+                        assembler.feed(content)
+                        if assembler.should_flush():
+                            with metrics.timer("tutor_render_seconds"):
+                                message_placeholder.markdown(assembler.text)
+                    st.session_state.cached_context = (prompt, cached_answer[:CONTEXT_CHARS])
+                else:
+                    # 上一个问题由缓存回答时，把那一问一答作为上文随本次问题发给机器人
+                    upstream_prompt = prompt
+                    if st.session_state.cached_context is not None:
+                        question, answer = st.session_state.cached_context
+                        upstream_prompt = f"上文：\n问：{question}\n答：{answer}\n\n请结合上文回答：{prompt}"
+                    for event, data in get_gateway(ws_url).stream(
+                        token_key[:4], token_provider, st.session_state.session_id, upstream_prompt
+                    ):
+                        if event == "queued":
+                            message_placeholder.markdown(f"排队中，前面还有 {data['position'] - 1} 个问题...")
+                        elif event == "error":
+                            error_message = f"错误: {data}"
+                            break
+                        elif event == "reply":
+                            if data["payload"]["is_from_self"]:
                                 continue
+                                
+                            # 获取响应内容和唯一标识
+                            content = data["payload"]["content"]
+                            segment_id = data["payload"].get("segment_id", "")
                             
-                            # 改进的响应解析逻辑
-                            match = re.match(r'^(\d+)(.*)$', rsp)
-                            if match:
-                                msg_type, msg_content = match.groups()
+                            # 避免重复内容
+                            if segment_id and segment_id in received_segments:
+                                continue
                                 
-                                try:
-                                    rsp_dict = json.loads(msg_content)
-                                    
-                                    if rsp_dict[0] == "error":
-                                        full_response = f"错误: {rsp_dict[1]}"
-                                        break
-                                    elif rsp_dict[0] == "reply":
-                                        if rsp_dict[1]["payload"]["is_from_self"]:
-                                            continue
-                                            
-                                        # 获取响应内容和唯一标识
-                                        content = rsp_dict[1]["payload"]["content"]
-                                        segment_id = rsp_dict[1]["payload"].get("segment_id", "")
-                                        
-                                        # 避免重复内容
-                                        if segment_id and segment_id in received_segments:
-                                            continue
-                                            
-                                        if segment_id:
-                                            received_segments.add(segment_id)
-                                        
-                                        # 追加新内容
-                                        new_content = content.replace(st.session_state.response_buffer, "")
-                                        full_response += new_content
-                                        st.session_state.response_buffer = full_response
-                                        
-                                        # 更新UI
-                                        message_placeholder.markdown(full_response)
-                                        
-                                        # 如果是最终回复，退出循环
-                                        if rsp_dict[1]["payload"]["is_final"]:
-                                            break
-                                except json.JSONDecodeError:
-                                    # 忽略无法解析的响应
-                                    continue
-                    return full_response
-                except Exception as e:
-                    return f"通信错误: {str(e)}"
-            
-            # 运行异步函数
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            answer = loop.run_until_complete(send_message_and_receive(prompt))
-            
-            # 重置缓冲区
-            st.session_state.response_buffer = ""
+                            if segment_id:
+                                received_segments.add(segment_id)
+                            
+                            # 从提问到收到第一帧回复，包含排队、取Token、连接和认证
+                            if first_reply:
+                                metrics.observe("tutor_first_reply_seconds", time.perf_counter() - asked_at)
+                                first_reply = False
+                            
+                            # 追加新内容，按节流预算更新UI
+                            assembler.feed(content)
+                            if assembler.should_flush():
+                                with metrics.timer("tutor_render_seconds"):
+                                    message_placeholder.markdown(assembler.text)
+                    if not error_message:
+                        st.session_state.cached_context = None
+                        metrics.observe("tutor_answer_seconds", time.perf_counter() - asked_at)
+                        if first_turn:
+                            answer_cache.put(token_key[2], prompt, assembler.text)
+            except GatewayBusy as e:
+                error_message = str(e)
+            except Exception as e:
+                error_message = f"通信错误: {str(e)}"
+            if error_message:
+                metrics.inc("tutor_errors_total")
+            answer = error_message or assembler.text
+            message_placeholder.markdown(answer)
             
             # 添加助手消息到会话状态
-            st.session_state.messages.append({"role": "assistant", "content": answer})
\ No newline at end of file
+            history.append("assistant", answer)
\ No newline at end of file
@@ -1,53 +1,26 @@
 import streamlit as st
-import networkx as nx
-import plotly.graph_objects as go
-from pyvis.network import Network
-import tempfile
-import base64
+import os
+from common import metrics
+from knowledge_graph.component import graph_payload, knowledge_graph
+from knowledge_graph.layout import LayoutCache
+from knowledge_graph.search import ConceptIndex
+from knowledge_graph.store import DATA_PATH, KnowledgeGraphStore
 
+# 知识图谱数据，进程内只加载一次；KNOWLEDGE_GRAPH_PATH可指定其他图谱文件（如压测数据）
+@st.cache_resource
+def get_graph_store():
+    return KnowledgeGraphStore.load(os.environ.get("KNOWLEDGE_GRAPH_PATH", DATA_PATH))
 
-# 页面配置
-st.set_page_config(
-    page_title="RPA财务机器人开发与应用知识图谱",
-    page_icon="📒",
-    layout="wide"
-)
+graph_store = get_graph_store()
 
-st.markdown("""
-<style>
-    /* 整体背景 */
-    .main {
-        background-color: #f8fafc;
-    }
-    
-    /* 卡片样式 */
-    .css-1r6slb0 {
-        background-color: #ffffff;
-        border-radius: 0.75rem;
-        padding: 1.5rem;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-        margin-bottom: 1.5rem;
-    }
-    
-    /* 标题样式 */
-    h1 {
-        color: #1e40af;
-        font-weight: 700;
-        margin-bottom: 1rem;
-    }
-    
-    h2 {
-        color: #334155;
-        font-weight: 600;
-        margin-bottom: 0.75rem;
-        border-bottom: 2px solid #e2e8f0;
-        padding-bottom: 0.5rem;
-    }
-    
+# 知识点名称和说明的搜索索引，进程内只建一次
+@st.cache_resource
+def get_concept_index():
+    return ConceptIndex(get_graph_store().nodes)
 
-   
-</style>
-""", unsafe_allow_html=True)
+# 搜索结果最多列出的知识点数，邻域子图最多显示的知识点数
+MAX_MATCHES = 20
+MAX_NEIGHBORHOOD = 200
 
 # 页面标题
 st.title("《RPA财务机器人开发与应用》课程知识图谱")
@@ -57,165 +30,38 @@ with st.sidebar:
     st.header("课程导航")
     topic_selection = st.radio(
         "选择知识主题:",
-        [
-            "RPA基础", 
-            "财务流程自动化", 
-            "数据处理与分析", 
-            "高级应用与集成", 
-            "最佳实践与案例"
-        ]
+        list(graph_store.topics)
     )
     
+    st.markdown("---")
+    st.subheader("知识点搜索")
+    concept_query = st.text_input("🔍 搜索知识点", "", help="支持名称、拼音首字母和说明中的文字")
+    concept = None
+    if concept_query:
+        matches = get_concept_index().search(concept_query, limit=MAX_MATCHES)
+        if len(matches):
+            concept = st.selectbox("选择知识点", [graph_store.nodes[i]["id"] for i in matches])
+        else:
+            st.caption("没有匹配的知识点")
+    hops = st.slider("邻域跳数", 1, 3, 1, disabled=concept is None)
+    
     st.markdown("---")
     st.subheader("交互设置")
     node_size = st.slider("节点大小", 10, 100, 30)
     edge_width = st.slider("边的粗细", 1, 10, 2)
     show_labels = st.checkbox("显示标签", True)
+    server_layout = st.checkbox("服务端预计算布局", True, help="在服务端计算节点坐标并关闭浏览器中的物理模拟")
+    render_mode = st.radio("渲染方式", ["轻量组件", "完整HTML"], help="轻量组件只传输图谱数据，绘图库由浏览器缓存")
     
     st.markdown("---")
     st.info("👈 选择左侧主题查看相应知识图谱")
 
-# 知识图谱数据
-def get_knowledge_graph_data(topic):
-    # 通用节点
-    nodes = [
-        {"id": "RPA财务机器人", "group": "核心", "title": "RPA财务机器人", 
-         "description": "机器人流程自动化(RPA)在财务领域的应用，通过软件机器人自动执行重复性财务任务。"},
-        {"id": "UiBot", "group": "工具", "title": "UiBot", 
-         "description": "领先的RPA平台，提供可视化设计器和强大的自动化功能。"},
-        {"id": "Automation Anywhere", "group": "工具", "title": "Automation Anywhere", 
-         "description": "企业级RPA平台，支持复杂流程自动化。"},
-        {"id": "Blue Prism", "group": "工具", "title": "Blue Prism", 
-         "description": "以治理和安全性著称的RPA平台。"},
-        {"id": "Python", "group": "编程语言", "title": "Python", 
-         "description": "用于RPA开发的高级编程语言，提供丰富的数据处理库。"},
-        {"id": "Excel", "group": "数据工具", "title": "Excel", 
-         "description": "财务分析中常用的电子表格软件，RPA常与之集成。"},
-        {"id": "Power BI", "group": "数据工具", "title": "Power BI", 
-         "description": "商业分析工具，用于可视化财务数据。"},
-    ]
-    
-    # 边的关系
-    edges = [
-        {"from": "RPA财务机器人", "to": "UiBot", "label": "常用工具"},
-        {"from": "RPA财务机器人", "to": "Automation Anywhere", "label": "常用工具"},
-        {"from": "RPA财务机器人", "to": "Blue Prism", "label": "常用工具"},
-        {"from": "RPA财务机器人", "to": "Python", "label": "开发语言"},
-        {"from": "RPA财务机器人", "to": "Excel", "label": "数据交互"},
-        {"from": "RPA财务机器人", "to": "Power BI", "label": "数据可视化"},
-    ]
-    
-    # 根据主题添加特定节点和边
-    if topic == "RPA基础":
-        nodes.extend([
-            {"id": "自动化基础", "group": "概念", "title": "自动化基础", 
-             "description": "理解自动化原理、流程分析与设计。"},
-            {"id": "流程挖掘", "group": "技术", "title": "流程挖掘", 
-             "description": "从现有系统中分析和发现可自动化的流程。"},
-            {"id": "OCR技术", "group": "技术", "title": "OCR技术", 
-             "description": "光学字符识别，用于从图像和文档中提取文本。"},
-            {"id": "AI与RPA集成", "group": "技术", "title": "AI与RPA集成", 
-             "description": "结合人工智能技术增强RPA的能力。"}
-        ])
-        edges.extend([
-            {"from": "RPA财务机器人", "to": "自动化基础", "label": "依赖"},
-            {"from": "RPA财务机器人", "to": "流程挖掘", "label": "依赖技术"},
-            {"from": "RPA财务机器人", "to": "OCR技术", "label": "常用技术"},
-            {"from": "RPA财务机器人", "to": "AI与RPA集成", "label": "技术趋势"},
-            {"from": "自动化基础", "to": "UiBot", "label": "工具实现"},
-            {"from": "OCR技术", "to": "UiBot", "label": "工具支持"}
-        ])
-        
-    elif topic == "财务流程自动化":
-        nodes.extend([
-            {"id": "应付账款", "group": "财务流程", "title": "应付账款", 
-             "description": "处理供应商发票和付款流程的自动化。"},
-            {"id": "应收账款", "group": "财务流程", "title": "应收账款", 
-             "description": "处理客户发票和收款流程的自动化。"},
-            {"id": "总账管理", "group": "财务流程", "title": "总账管理", 
-             "description": "会计科目维护、日记账处理和结账流程的自动化。"},
-            {"id": "财务报表", "group": "财务流程", "title": "财务报表", 
-             "description": "自动生成资产负债表、利润表和现金流量表。"}
-        ])
-        edges.extend([
-            {"from": "RPA财务机器人", "to": "应付账款", "label": "应用场景"},
-            {"from": "RPA财务机器人", "to": "应收账款", "label": "应用场景"},
-            {"from": "RPA财务机器人", "to": "总账管理", "label": "应用场景"},
-            {"from": "RPA财务机器人", "to": "财务报表", "label": "应用场景"},
-            {"from": "应付账款", "to": "Excel", "label": "数据交互"},
-            {"from": "应收账款", "to": "Excel", "label": "数据交互"},
-            {"from": "财务报表", "to": "Power BI", "label": "可视化工具"}
-        ])
-        
-    elif topic == "数据处理与分析":
-        nodes.extend([
-            {"id": "数据清洗", "group": "数据操作", "title": "数据清洗", 
-             "description": "处理缺失值、重复数据和错误数据的过程。"},
-            {"id": "数据整合", "group": "数据操作", "title": "数据整合", 
-             "description": "将来自不同系统的数据合并为统一视图。"},
-            {"id": "异常检测", "group": "数据分析", "title": "异常检测", 
-             "description": "识别财务数据中的异常交易和模式。"},
-            {"id": "预测分析", "group": "数据分析", "title": "预测分析", 
-             "description": "使用历史数据预测未来财务趋势。"}
-        ])
-        edges.extend([
-            {"from": "RPA财务机器人", "to": "数据清洗", "label": "数据处理"},
-            {"from": "RPA财务机器人", "to": "数据整合", "label": "数据处理"},
-            {"from": "RPA财务机器人", "to": "异常检测", "label": "数据分析"},
-            {"from": "RPA财务机器人", "to": "预测分析", "label": "数据分析"},
-            {"from": "数据清洗", "to": "Python", "label": "实现语言"},
-            {"from": "数据整合", "to": "Python", "label": "实现语言"},
-            {"from": "异常检测", "to": "Python", "label": "实现语言"},
-            {"from": "预测分析", "to": "Python", "label": "实现语言"},
-            {"from": "数据整合", "to": "Excel", "label": "数据来源"}
-        ])
-        
-    elif topic == "高级应用与集成":
-        nodes.extend([
-            {"id": "ERP系统集成", "group": "集成应用", "title": "ERP系统集成", 
-             "description": "与企业资源规划系统如SAP、Oracle集成。"},
-            {"id": "API调用", "group": "技术", "title": "API调用", 
-             "description": "通过API与其他系统进行数据交互。"},
-            {"id": "机器学习模型", "group": "技术", "title": "机器学习模型", 
-             "description": "使用机器学习算法改进财务预测和决策。"},
-            {"id": "区块链技术", "group": "技术", "title": "区块链技术", 
-             "description": "在财务交易和审计中应用区块链技术。"}
-        ])
-        edges.extend([
-            {"from": "RPA财务机器人", "to": "ERP系统集成", "label": "系统集成"},
-            {"from": "RPA财务机器人", "to": "API调用", "label": "技术手段"},
-            {"from": "RPA财务机器人", "to": "机器学习模型", "label": "技术扩展"},
-            {"from": "RPA财务机器人", "to": "区块链技术", "label": "技术扩展"},
-            {"from": "ERP系统集成", "to": "UiBot", "label": "工具支持"},
-            {"from": "API调用", "to": "Python", "label": "实现语言"},
-            {"from": "机器学习模型", "to": "Python", "label": "实现语言"}
-        ])
-        
-    elif topic == "最佳实践与案例":
-        nodes.extend([
-            {"id": "审计自动化", "group": "案例", "title": "审计自动化", 
-             "description": "自动执行财务审计程序，提高审计效率。"},
-            {"id": "税务申报", "group": "案例", "title": "税务申报", 
-             "description": "自动收集和整理税务数据，生成税务申报表。"},
-            {"id": "合规检查", "group": "案例", "title": "合规检查", 
-             "description": "自动监控财务流程，确保符合法规要求。"},
-            {"id": "财务共享中心", "group": "案例", "title": "财务共享中心", 
-             "description": "在财务共享服务中心实施RPA的最佳实践。"}
-        ])
-        edges.extend([
-            {"from": "RPA财务机器人", "to": "审计自动化", "label": "应用案例"},
-            {"from": "RPA财务机器人", "to": "税务申报", "label": "应用案例"},
-            {"from": "RPA财务机器人", "to": "合规检查", "label": "应用案例"},
-            {"from": "RPA财务机器人", "to": "财务共享中心", "label": "应用案例"},
-            {"from": "审计自动化", "to": "Power BI", "label": "报告工具"},
-            {"from": "税务申报", "to": "Excel", "label": "数据交互"},
-            {"from": "合规检查", "to": "Python", "label": "规则引擎"}
-        ])
-    
-    return nodes, edges
-
 # 创建知识图谱
-def create_knowledge_graph(nodes, edges, node_size=30, edge_width=2, show_labels=True):
+def create_knowledge_graph(nodes, edges, node_size=30, edge_width=2, show_labels=True, positions=None):
+    # networkx和pyvis导入较慢，只在生成完整HTML时才导入
+    import networkx as nx
+    from pyvis.network import Network
+
     G = nx.DiGraph()
     
     # 添加节点
@@ -252,7 +98,8 @@ def create_knowledge_graph(nodes, edges, node_size=30, edge_width=2, show_labels
             label=node_id if show_labels else "",
             title=f"{node_data['title']}<br><br>{node_data['description']}",
             group=node_data["group"],
-            size=node_size
+            size=node_size,
+            **({"x": positions[node_id][0], "y": positions[node_id][1], "physics": False} if positions else {})
         )
     
     for edge in G.edges(data=True):
@@ -263,7 +110,11 @@ def create_knowledge_graph(nodes, edges, node_size=30, edge_width=2, show_labels
             width=edge_width
         )
     
-    # 设置物理布局
+    # 设置物理布局：已有服务端坐标时关闭物理模拟，浏览器直接绘制
+    if positions:
+        net.toggle_physics(False)
+        return net
+    
     net.force_atlas_2based(
         gravity=-50,
         central_gravity=0.01,
@@ -275,97 +126,93 @@ def create_knowledge_graph(nodes, edges, node_size=30, edge_width=2, show_labels
     
     return net
 
+# 节点坐标按主题缓存，知识点邻域只保留最近的若干个；已算过的节点作为后续布局的初始位置
+@st.cache_resource
+def get_layout_cache():
+    return LayoutCache()
+
+# 知识点的k跳邻域，在缓存的邻接数组上BFS，按(知识点, 跳数)缓存
+@st.cache_resource(max_entries=256)
+def get_neighborhood(node_id, hops):
+    store = get_graph_store()
+    return store.neighborhood(store.node_index[node_id], hops, max_nodes=MAX_NEIGHBORHOOD)
+
+def graph_view(scope):
+    """scope为("topic", 主题)或("concept", 知识点, 跳数)"""
+    if scope[0] == "topic":
+        return get_graph_store().topic_view(scope[1])
+    return get_neighborhood(*scope[1:])
+
+@st.cache_resource(max_entries=32)
+def build_graph_payload(scope, node_size, edge_width, show_labels, server_layout=True):
+    """生成轻量组件所需的节点、边和选项，按交互参数缓存"""
+    with metrics.timer("graph_build_seconds", mode="component"):
+        view = graph_view(scope)
+        positions = get_layout_cache().positions(scope, view, pin=scope[0] == "topic") if server_layout else None
+        focus = scope[1] if scope[0] == "concept" else None
+        return graph_payload(view, node_size, edge_width, show_labels, positions, focus)
+
+@st.cache_resource(max_entries=32)
+def render_knowledge_graph(scope, node_size, edge_width, show_labels, server_layout=True):
+    """生成独立的知识图谱HTML，按(主题或邻域, 节点大小, 边粗细, 是否显示标签, 布局方式)缓存"""
+    with metrics.timer("graph_build_seconds", mode="html"):
+        view = graph_view(scope)
+        positions = get_layout_cache().positions(scope, view, pin=scope[0] == "topic") if server_layout else None
+        net = create_knowledge_graph(view.nodes, view.edges, node_size, edge_width, show_labels, positions)
+        return net.generate_html()
+
+def request_download(params):
+    st.session_state.download_params = params
+
 # 主内容区
 col1, col2 = st.columns([3, 1])
 
+# 选中知识点时显示它的邻域，否则显示所选主题
+if concept is not None:
+    scope = ("concept", concept, hops)
+    graph_title = f"{concept}的{hops}跳邻域"
+else:
+    scope = ("topic", topic_selection)
+    graph_title = f"{topic_selection}知识图谱"
+
 with col1:
-    st.subheader(f"{topic_selection}知识图谱")
-    
-    # 获取数据
-    nodes, edges = get_knowledge_graph_data(topic_selection)
-    
-    # 创建知识图谱
-    net = create_knowledge_graph(nodes, edges, node_size, edge_width, show_labels)
-    
-    # 保存为HTML
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as f:
-        net.save_graph(f.name)
-        html_file = f.name
-    
-    # 显示HTML
-    with open(html_file, "r", encoding="utf-8") as f:
-        html_content = f.read()
-        st.components.v1.html(html_content, height=600)
-    
-    # 下载按钮
-    with open(html_file, "rb") as f:
-        bytes_data = f.read()
-        b64 = base64.b64encode(bytes_data).decode()
-        href = f'<a href="data:file/html;base64,{b64}" download="知识图谱_{topic_selection}.html">下载知识图谱</a>'
-        st.markdown(href, unsafe_allow_html=True)
+    st.subheader(graph_title)
+    graph_params = (scope, node_size, edge_width, show_labels, server_layout)
+    if concept is not None and len(graph_view(scope)) >= MAX_NEIGHBORHOOD:
+        st.caption(f"邻域较大，只显示距离最近的{MAX_NEIGHBORHOOD}个知识点")
+    
+    # 显示知识图谱：轻量组件只传输图谱数据，完整HTML每次传输整份文档
+    if render_mode == "轻量组件":
+        payload = build_graph_payload(*graph_params)
+        with metrics.timer("graph_render_seconds", mode="component"):
+            knowledge_graph(payload, height=600, key="knowledge_graph")
+    else:
+        html = render_knowledge_graph(*graph_params)
+        with metrics.timer("graph_render_seconds", mode="html"):
+            st.components.v1.html(html, height=600)
+    
+    # 下载按钮：点击后才生成独立HTML
+    if st.session_state.get("download_params") == graph_params:
+        st.download_button(
+            "下载知识图谱",
+            render_knowledge_graph(*graph_params),
+            file_name=f"知识图谱_{graph_title}.html",
+            mime="text/html"
+        )
+    else:
+        st.button("生成下载文件", on_click=request_download, args=(graph_params,))
 
 with col2:
-    st.subheader("知识主题说明")
-    
-    if topic_selection == "RPA基础":
-        st.markdown("""
-        **RPA基础**主题涵盖了RPA的基本概念、核心技术和工具。
-        
-        主要内容包括：
-        - 自动化基础原理
-        - 流程挖掘技术
-        - OCR技术应用
-        - AI与RPA的集成
-        - 主流RPA工具介绍
-        """)
-        
-    elif topic_selection == "财务流程自动化":
-        st.markdown("""
-        **财务流程自动化**主题聚焦于RPA在财务领域的具体应用场景。
-        
-        主要内容包括：
-        - 应付账款流程自动化
-        - 应收账款流程自动化
-        - 总账管理自动化
-        - 财务报表自动生成
-        - 财务数据处理与分析
-        """)
-        
-    elif topic_selection == "数据处理与分析":
-        st.markdown("""
-        **数据处理与分析**主题介绍了RPA与数据分析技术的结合应用。
-        
-        主要内容包括：
-        - 财务数据清洗与预处理
-        - 多系统数据整合
-        - 异常交易检测
-        - 财务预测分析
-        - Python在财务数据处理中的应用
-        """)
-        
-    elif topic_selection == "高级应用与集成":
-        st.markdown("""
-        **高级应用与集成**主题探讨了RPA在复杂场景中的应用和技术扩展。
-        
-        主要内容包括：
-        - ERP系统集成方案
-        - API调用与系统交互
-        - 机器学习在财务中的应用
-        - 区块链与财务审计
-        - RPA性能优化与扩展
-        """)
-        
-    elif topic_selection == "最佳实践与案例":
-        st.markdown("""
-        **最佳实践与案例**主题通过实际案例展示RPA在财务领域的成功应用。
+    if concept is not None:
+        st.subheader("知识点说明")
+        node = graph_store.nodes[graph_store.node_index[concept]]
+        st.markdown(f"**{node['title']}**（{node['group']}）\n\n{node['description']}")
+        view = graph_view(scope)
+        st.caption(f"邻域内共{len(view)}个知识点、{len(view.edge_ids)}条关系")
+    else:
+        st.subheader("知识主题说明")
         
-        主要内容包括：
-        - 审计流程自动化
-        - 税务申报自动化
-        - 合规检查自动化
-        - 财务共享中心RPA实施
-        - RPA项目实施方法论
-        """)
+        st.markdown(graph_store.topics[topic_selection])
     
     st.markdown("---")
     st.info("""
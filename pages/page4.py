@@ -0,0 +1,48 @@
+import hmac
+import os
+import streamlit as st
+import pandas as pd
+from common import metrics
+
+st.title("运行指标")
+
+# 只对管理员开放：需要设置APP_ADMIN_PASSWORD，并在本会话中输入一次密码
+admin_password = os.environ.get("APP_ADMIN_PASSWORD", "")
+if not admin_password:
+    st.info("运行指标页面只对管理员开放，设置环境变量 APP_ADMIN_PASSWORD 后重启应用即可使用。")
+    st.stop()
+if not st.session_state.get("metrics_admin"):
+    password = st.text_input("管理员密码", type="password")
+    if not password:
+        st.stop()
+    if not hmac.compare_digest(password.encode("utf-8"), admin_password.encode("utf-8")):
+        st.error("密码错误")
+        st.stop()
+    st.session_state.metrics_admin = True
+    st.rerun()
+
+if not metrics.ENABLED:
+    st.info("指标记录未开启，设置环境变量 APP_METRICS=1 后重启应用即可开始记录。")
+    st.stop()
+
+if metrics.exporter_error:
+    st.warning(metrics.exporter_error)
+
+# 各指标的次数、耗时均值和按桶估计的分位数（秒）
+rows = metrics.REGISTRY.snapshot()
+if rows:
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+else:
+    st.caption("还没有记录到指标")
+
+col1, col2 = st.columns([1, 5])
+with col1:
+    st.button("刷新")
+with col2:
+    st.button("清空指标", on_click=metrics.REGISTRY.clear)
+
+# Prometheus文本格式，设置APP_METRICS_PORT时也可以从 http://<主机>:<端口>/metrics 抓取
+with st.expander("Prometheus文本格式"):
+    text = metrics.REGISTRY.render_prometheus()
+    st.code(text, language="text")
+    st.download_button("下载", text, file_name="metrics.prom", mime="text/plain")
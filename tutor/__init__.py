@@ -0,0 +1 @@
+"""AI智能助教与腾讯云智能体开发平台(LKE)的通信组件"""
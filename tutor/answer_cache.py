@@ -0,0 +1,166 @@
+"""常见课程问题的答案缓存
+
+问题先做归一化（全角转半角、统一小写、去掉标点和空白）后精确匹配；设置
+near_threshold时，未命中的问题再用字符二元组倒排索引找近似重复的问题（默认关闭，
+“C++”和“C#”这类只差一两个字符的问题容易误命中）。缓存按LRU和TTL淘汰，定期写入磁盘，
+重启后继续使用。
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+
+# 属于标点类别但常出现在术语中的字符
+_KEPT_PUNCTUATION = frozenset("#%&*@/\\")
+
+
+def normalize_question(text):
+    """全角转半角、统一小写，并去掉标点、空白和控制字符
+
+    符号（如C++中的+）和C#、%这类会改变问题含义的字符保留不去掉。
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(ch for ch in text if ch in _KEPT_PUNCTUATION or unicodedata.category(ch)[0] not in "PZC")
+
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+
+class AnswerCache:
+    """按(命名空间, 归一化问题)缓存答案，命名空间一般为机器人应用的AppKey"""
+
+    def __init__(self, path=None, max_entries=1000, ttl=7 * 24 * 3600, near_threshold=None,
+                 save_interval=30):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.near_threshold = near_threshold
+        self.save_interval = save_interval
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+        self._entries = OrderedDict()  # (命名空间, 归一化问题) -> [答案, 写入时间]
+        self._grams = {}               # (命名空间, 二元组) -> {归一化问题}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        if path:
+            if os.path.exists(path):
+                self._load()
+            atexit.register(self.flush)
+
+    @property
+    def hit_rate(self):
+        hits = self.stats["exact_hits"] + self.stats["near_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def get(self, namespace, question):
+        """返回缓存的答案，未命中返回None"""
+        norm = normalize_question(question)
+        if not norm:
+            return None
+        now = time.time()
+        with self._lock:
+            key = (namespace, norm)
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+            if self.near_threshold:
+                key = self._nearest(namespace, norm, now)
+                if key is not None:
+                    self._entries.move_to_end(key)
+                    self.stats["near_hits"] += 1
+                    return self._entries[key][0]
+            self.stats["misses"] += 1
+            return None
+
+    def _nearest(self, namespace, norm, now):
+        grams = _bigrams(norm)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get((namespace, gram), ()))
+        best, best_score = None, self.near_threshold
+        for candidate, count in shared.items():
+            # Dice系数：2|A∩B| / (|A| + |B|)
+            score = 2 * count / (len(grams) + len(_bigrams(candidate)))
+            if score >= best_score and now - self._entries[(namespace, candidate)][1] <= self.ttl:
+                best, best_score = (namespace, candidate), score
+        return best
+
+    def put(self, namespace, question, answer):
+        norm = normalize_question(question)
+        if not norm or not answer:
+            return
+        with self._lock:
+            self._insert((namespace, norm), answer, time.time())
+            self._dirty = True
+            if self.path and time.monotonic() - self._saved_at >= self.save_interval:
+                self._save()
+
+    def _insert(self, key, answer, created_at):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            for gram in _bigrams(key[1]):
+                self._grams.setdefault((key[0], gram), set()).add(key[1])
+        self._entries[key] = [answer, created_at]
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        del self._entries[key]
+        for gram in _bigrams(key[1]):
+            postings = self._grams.get((key[0], gram))
+            if postings is not None:
+                postings.discard(key[1])
+                if not postings:
+                    del self._grams[(key[0], gram)]
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        now = time.time()
+        for namespace, norm, answer, created_at in records:
+            if now - created_at <= self.ttl:
+                self._insert((namespace, norm), answer, created_at)
+
+    def _save(self):
+        records = [[ns, norm, answer, created_at] for (ns, norm), (answer, created_at) in self._entries.items()]
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def flush(self):
+        """把未保存的改动写入磁盘"""
+        with self._lock:
+            if self.path and self._dirty:
+                self._save()
+
+
+def replay(answer, chunk_chars=8, interval=0.02, max_seconds=1.5):
+    """按流式输出的节奏逐段产出答案的累积内容，总时长不超过max_seconds"""
+    steps = max(1, len(answer) // chunk_chars)
+    if steps * interval > max_seconds:
+        steps = max(1, int(max_seconds / interval))
+    size = -(-len(answer) // steps)
+    for end in range(size, len(answer) + size, size):
+        yield answer[:end]
+        if end < len(answer):
+            time.sleep(interval)
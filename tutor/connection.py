@@ -0,0 +1,226 @@
+"""AI智能助教与LKE之间的WebSocket长连接
+
+Streamlit每次重跑都会重新执行页面脚本，连接不能放在脚本里创建。这里的连接运行在
+后台线程常驻的asyncio事件循环中：认证一次后长期复用，自动应答心跳，按request_id
+把回复帧分发给对应的提问，断开后在下一次提问时透明重连。
+"""
+
+import asyncio
+import json
+import re
+import ssl
+import threading
+import time
+import uuid
+
+from common import metrics
+
+LKE_WS_URL = "wss://wss.lke.cloud.tencent.com/v1/qbot/chat/conn/?EIO=4&transport=websocket"
+
+# Engine.IO帧：数字类型前缀 + 内容
+_FRAME_RE = re.compile(r'^(\d+)(.*)$', re.S)
+
+# 连接断开时投递给等待中请求的标记
+_CLOSED = object()
+
+
+def make_ssl_context():
+    """使用certifi证书创建SSL上下文"""
+    import certifi
+
+    ssl_context = ssl.create_default_context()
+    ssl_context.load_verify_locations(certifi.where())
+    return ssl_context
+
+
+class LKEError(Exception):
+    """LKE返回的认证或业务错误"""
+
+
+class ConnectionLost(Exception):
+    """回答过程中上游连接断开"""
+
+
+class BackgroundLoop:
+    """在守护线程中常驻运行的asyncio事件循环"""
+
+    def __init__(self, name="lke-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """从任意线程提交协程，返回concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class UpstreamConnection:
+    """一条已认证的Socket.IO连接，按request_id把回复帧分发给对应的请求"""
+
+    def __init__(self, url, token_provider, ssl_context=None, open_timeout=10):
+        self.url = url
+        self.token_provider = token_provider
+        self.ssl_context = ssl_context
+        self.open_timeout = open_timeout
+        self.last_used = time.monotonic()
+        self._ws = None
+        self._reader = None
+        self._connect_lock = asyncio.Lock()
+        self._pending = {}
+
+    @property
+    def connected(self):
+        return self._ws is not None and self._reader is not None and not self._reader.done()
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    async def ensure_connected(self):
+        if self.connected:
+            return
+        async with self._connect_lock:
+            if not self.connected:
+                await self._connect()
+
+    async def _connect(self):
+        # websockets只在真正建立连接时才导入，打开页面时不需要
+        import websockets
+
+        kwargs = {"open_timeout": self.open_timeout}
+        if self.url.startswith("wss://"):
+            kwargs["ssl"] = self.ssl_context or make_ssl_context()
+        # Token只能校验一次，每次建立连接都取一个新的；GetWsToken是同步调用，放到线程池执行
+        with metrics.timer("tutor_token_seconds"):
+            token = await asyncio.get_running_loop().run_in_executor(None, self.token_provider)
+        with metrics.timer("tutor_ws_connect_seconds"):
+            ws = await websockets.connect(self.url, **kwargs)
+        auth_started = time.perf_counter()
+        try:
+            # 接收Engine.IO握手
+            await asyncio.wait_for(ws.recv(), self.open_timeout)
+
+            # 发送认证消息
+            await ws.send(f"40{json.dumps({'token': token})}")
+
+            # 接收认证结果，期间可能夹带心跳
+            while True:
+                auth_response = await asyncio.wait_for(ws.recv(), self.open_timeout)
+                if auth_response == "2":
+                    await ws.send("3")
+                    continue
+                break
+            if auth_response.startswith("44"):
+                metrics.inc("tutor_auth_failures_total")
+                raise LKEError(f"认证失败: {auth_response[2:]}")
+        except BaseException:
+            await ws.close()
+            raise
+        metrics.observe("tutor_ws_auth_seconds", time.perf_counter() - auth_started)
+        metrics.inc("tutor_connections_total")
+        self._ws = ws
+        self._reader = asyncio.create_task(self._read_loop(ws))
+
+    async def _read_loop(self, ws):
+        import websockets
+
+        try:
+            async for rsp in ws:
+                if not isinstance(rsp, str):
+                    continue
+                if rsp == "2":
+                    # 收到心跳包，回复心跳
+                    await ws.send("3")
+                    continue
+                match = _FRAME_RE.match(rsp)
+                if not match or match.group(1) != "42":
+                    continue
+                try:
+                    event = json.loads(match.group(2))
+                except json.JSONDecodeError:
+                    # 忽略无法解析的响应
+                    continue
+                if isinstance(event, list) and event:
+                    self._dispatch(event)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            for frames in self._pending.values():
+                frames.put_nowait(_CLOSED)
+
+    def _dispatch(self, event):
+        name = event[0]
+        data = event[1] if len(event) > 1 else None
+        request_id = None
+        if isinstance(data, dict):
+            payload = data.get("payload")
+            request_id = data.get("request_id") or (payload.get("request_id") if isinstance(payload, dict) else None)
+        if request_id is None:
+            # 没有request_id的事件（如连接级错误）通知所有等待中的请求
+            for frames in self._pending.values():
+                frames.put_nowait((name, data))
+        elif request_id in self._pending:
+            self._pending[request_id].put_nowait((name, data))
+
+    async def ask(self, session_id, prompt, emit, request_id=None):
+        """发送一个问题，把属于它的每一帧交给emit(事件名, 数据)，直到最终回复或错误"""
+        import websockets
+
+        request_id = request_id or str(uuid.uuid1())
+        frames = asyncio.Queue()
+        self._pending[request_id] = frames
+        try:
+            for attempt in range(2):
+                await self.ensure_connected()
+                payload = {
+                    "payload": {
+                        "request_id": request_id,
+                        "session_id": session_id,
+                        "content": prompt,
+                    }
+                }
+                received = False
+                try:
+                    await self._ws.send(f"42{json.dumps(['send', payload], ensure_ascii=False)}")
+                except (websockets.ConnectionClosed, AttributeError):
+                    pass
+                else:
+                    while True:
+                        item = await frames.get()
+                        if item is _CLOSED:
+                            break
+                        received = True
+                        self.last_used = time.monotonic()
+                        emit(*item)
+                        if _is_last_frame(*item):
+                            return
+                # 尚未收到任何回复时透明重连并重发一次
+                if received or attempt:
+                    raise ConnectionLost("与AI助教的连接已断开")
+        finally:
+            self._pending.pop(request_id, None)
+            self.last_used = time.monotonic()
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+
+def _is_last_frame(name, data):
+    if name == "error":
+        return True
+    if name == "reply":
+        payload = data["payload"]
+        return not payload.get("is_from_self") and payload.get("is_final")
+    return False
@@ -0,0 +1,124 @@
+"""多路复用的AI助教网关
+
+所有会话共用一个后台事件循环。同一组凭证下的提问复用少量上游连接，回复帧按
+request_id路由回各自的提问者；同时在途的提问数受max_concurrency限制，超出部分
+排队等待，排队也满时立即拒绝，避免把压力传给上游和脚本线程。
+"""
+
+import asyncio
+import math
+import queue
+import time
+
+from tutor.connection import LKE_WS_URL, BackgroundLoop, UpstreamConnection, make_ssl_context
+
+_DONE = object()
+
+
+class GatewayBusy(Exception):
+    """排队人数已满"""
+
+
+class TutorGateway:
+    """在少量上游连接上复用大量并发提问，供Streamlit脚本线程同步调用"""
+
+    def __init__(self, url=LKE_WS_URL, ssl_context=None, max_connections=4, max_concurrency=32,
+                 max_queue=64, reply_timeout=120, idle_timeout=600):
+        self.url = url
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.reply_timeout = reply_timeout
+        self.idle_timeout = idle_timeout
+        # 每条连接上期望承载的在途提问数，超过后才新开连接
+        self.streams_per_connection = math.ceil(max_concurrency / max_connections)
+        self.waiting = 0
+        self._ssl_context = ssl_context or make_ssl_context()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._pools = {}
+        self._background = BackgroundLoop("lke-gateway")
+        self._reaper = self._background.submit(self._reap_idle())
+
+    @property
+    def connections(self):
+        return sum(len(pool) for pool in self._pools.values())
+
+    def _connection(self, pool_key, token_provider):
+        # 只在事件循环线程中调用，无需加锁
+        pool = self._pools.setdefault(pool_key, [])
+        for conn in pool:
+            conn.token_provider = token_provider
+        conn = min(pool, key=lambda c: c.in_flight, default=None)
+        if conn is None or (conn.in_flight >= self.streams_per_connection and len(pool) < self.max_connections):
+            conn = UpstreamConnection(self.url, token_provider, self._ssl_context)
+            pool.append(conn)
+        return conn
+
+    async def _warm(self, pool_key, token_provider):
+        await self._connection(pool_key, token_provider).ensure_connected()
+
+    async def _ask(self, pool_key, token_provider, session_id, prompt, emit):
+        if self._slots.locked():
+            if self.waiting >= self.max_queue:
+                raise GatewayBusy("当前提问人数较多，请稍后再试")
+            emit("queued", {"position": self.waiting + 1})
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            conn = self._connection(pool_key, token_provider)
+            await conn.ask(session_id, prompt, emit)
+        finally:
+            self._slots.release()
+
+    async def _reap_idle(self):
+        while True:
+            await asyncio.sleep(min(60, self.idle_timeout))
+            now = time.monotonic()
+            for pool_key, pool in list(self._pools.items()):
+                for conn in list(pool):
+                    if not conn.in_flight and now - conn.last_used > self.idle_timeout:
+                        pool.remove(conn)
+                        await conn.close()
+                if not pool:
+                    del self._pools[pool_key]
+
+    def warm(self, pool_key, token_provider):
+        """提前建立并认证连接，返回可等待的Future"""
+        return self._background.submit(self._warm(pool_key, token_provider))
+
+    def stream(self, pool_key, token_provider, session_id, prompt):
+        """在脚本线程中同步迭代一个问题的回复帧(事件名, 数据)
+
+        pool_key标识一组凭证，同组提问共用连接池；token_provider在(重新)建立连接时
+        调用，返回一个新的Token。排队时会先产出("queued", {"position": n})。
+        """
+        frames = queue.Queue()
+        future = self._background.submit(
+            self._ask(pool_key, token_provider, session_id, prompt, lambda *item: frames.put(item))
+        )
+        future.add_done_callback(lambda _: frames.put(_DONE))
+        try:
+            while True:
+                try:
+                    item = frames.get(timeout=self.reply_timeout)
+                except queue.Empty:
+                    raise TimeoutError("等待AI助教回复超时")
+                if item is _DONE:
+                    break
+                yield item
+            future.result()
+        finally:
+            future.cancel()
+
+    def close(self):
+        async def _close_all():
+            for pool in self._pools.values():
+                for conn in pool:
+                    await conn.close()
+            self._pools.clear()
+        self._reaper.cancel()
+        self._background.submit(_close_all()).result(timeout=5)
+        self._background.stop()
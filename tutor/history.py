@@ -0,0 +1,56 @@
+"""有界的聊天记录存储
+
+只有最近的若干轮对话保留为活跃消息，每次重跑都会渲染；更早的消息按页压缩归档，
+由"显示更早的消息"按需解压展示；归档页数同样有上限，超出后丢弃最旧的一页。
+"""
+
+import json
+import zlib
+from collections import deque
+
+
+class Message:
+    """一条聊天消息"""
+
+    __slots__ = ("role", "content")
+
+    def __init__(self, role, content):
+        self.role = role
+        self.content = content
+
+
+class ChatHistory:
+    """按轮数封顶的聊天记录，一轮为一问一答两条消息"""
+
+    def __init__(self, max_turns=20, page_turns=10, max_pages=10):
+        self.max_live = max_turns * 2
+        self.page_size = page_turns * 2
+        self.max_pages = max_pages
+        self.live = deque()
+        self.dropped = 0
+        self._pages = deque()
+
+    def append(self, role, content):
+        self.live.append(Message(role, content))
+        if len(self.live) >= self.max_live + self.page_size:
+            page = [self.live.popleft() for _ in range(self.page_size)]
+            self._archive(page)
+
+    def _archive(self, page):
+        data = json.dumps([[m.role, m.content] for m in page], ensure_ascii=False)
+        self._pages.append(zlib.compress(data.encode("utf-8")))
+        if len(self._pages) > self.max_pages:
+            self._pages.popleft()
+            self.dropped += self.page_size
+
+    @property
+    def archived_pages(self):
+        return len(self._pages)
+
+    def page(self, index):
+        """返回第index页归档消息，0为最近归档的一页"""
+        data = zlib.decompress(self._pages[-1 - index]).decode("utf-8")
+        return [Message(role, content) for role, content in json.loads(data)]
+
+    def __len__(self):
+        return len(self.live) + len(self._pages) * self.page_size
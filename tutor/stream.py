@@ -0,0 +1,57 @@
+"""流式回复的增量拼接与界面刷新节流"""
+
+import time
+
+
+class ReplyAssembler:
+    """把LKE的reply帧拼接成完整回答
+
+    reply帧的content一般是截至当前的累积全文。这里记录已消费的偏移，只截取新增的
+    后缀追加到片段列表，需要展示时才拼接，避免每帧都对整段文本做替换和重建。
+    界面刷新按时间或字数预算节流。
+    """
+
+    # 用于确认新帧是上一帧延续的重叠字符数
+    OVERLAP = 16
+
+    def __init__(self, flush_interval=0.05, flush_chars=512):
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self._chunks = []
+        self._frame_offset = 0   # 当前累积帧已消费到的位置
+        self._frame_tail = ""    # 当前累积帧已消费部分的末尾
+        self._pending = 0        # 上次刷新后新增的字符数
+        self._last_flush = time.monotonic()
+
+    def feed(self, content):
+        """喂入一帧内容，返回其中新增的文本"""
+        offset = self._frame_offset
+        tail = self._frame_tail
+        if offset and len(content) >= offset and content[offset - len(tail):offset] == tail:
+            new_content = content[offset:]
+        else:
+            # 与已消费内容不衔接，视为新的一段
+            new_content = content
+        if new_content:
+            self._chunks.append(new_content)
+            self._pending += len(new_content)
+        self._frame_offset = len(content)
+        self._frame_tail = content[-self.OVERLAP:]
+        return new_content
+
+    @property
+    def text(self):
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def should_flush(self):
+        """距上次刷新超过时间预算或积累了足够多的新字符时返回True"""
+        if not self._pending:
+            return False
+        now = time.monotonic()
+        if self._pending >= self.flush_chars or now - self._last_flush >= self.flush_interval:
+            self._pending = 0
+            self._last_flush = now
+            return True
+        return False
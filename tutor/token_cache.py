@@ -0,0 +1,196 @@
+"""GetWsToken的进程级缓存
+
+LKE的WebSocket Token有效期60秒，且只能校验一次，不能在多个连接之间共享。
+因此这里缓存的是每组凭证下一小批预取的Token：取用时弹出一个，后台线程只在上次
+补齐之后确实有Token被取走时才补齐，没人取用时Token自然过期，不再定期替换（网关的
+连接保持打开，多数时候用不到新Token）。缓存为空时同时到来的请求等同一次获取完成，
+不各自调用GetWsToken。LkeClient按凭证复用，不再每次点击都重新构造。
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
+
+from common import metrics
+
+# Token有效期（秒），见GetWsTokenResponse.Token说明
+TOKEN_TTL = 60
+
+
+class _Entry:
+    __slots__ = ("key", "secret_key", "region", "tokens", "last_used", "taken", "fetching", "waiters")
+
+    def __init__(self, key, secret_key, region):
+        self.key = key
+        self.secret_key = secret_key
+        self.region = region
+        self.tokens = deque()  # (过期时间, token)
+        self.last_used = time.monotonic()
+        self.taken = False     # 上次补齐之后是否有Token被取走
+        self.fetching = False  # 是否有线程正在为这组凭证调用GetWsToken
+        self.waiters = 0       # 等待这次获取的acquire调用数
+
+
+class TokenCache:
+    """按(secret_id, bot_app_key, visitor_biz_id)预取并缓存Token"""
+
+    def __init__(self, ttl=TOKEN_TTL, margin=10, pool_size=2, idle_timeout=300):
+        self.ttl = ttl
+        self.margin = margin
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.calls = 0
+        self._entries = {}
+        self._clients = {}
+        self._cond = threading.Condition()
+        self._refiller = None
+
+    def _client(self, secret_id, secret_key, region):
+        client_key = (secret_id, secret_key, region)
+        with self._cond:
+            client = self._clients.get(client_key)
+            if client is None:
+                # 腾讯云SDK导入较慢，第一次获取Token时才导入
+                from tencentcloud.common import credential
+                from tencentcloud.common.profile.client_profile import ClientProfile
+                from tencentcloud.common.profile.http_profile import HttpProfile
+                from tencentcloud.lke.v20231130 import lke_client
+
+                # 实例化一个认证对象
+                cred = credential.Credential(secret_id, secret_key)
+                # 实例化一个http选项
+                httpProfile = HttpProfile()
+                httpProfile.endpoint = "lke.tencentcloudapi.com"
+
+                # 实例化一个client选项
+                clientProfile = ClientProfile()
+                clientProfile.httpProfile = httpProfile
+                # 实例化要请求产品的client对象
+                client = lke_client.LkeClient(cred, region, clientProfile)
+                self._clients[client_key] = client
+        return client
+
+    def _fetch(self, entry):
+        from tencentcloud.lke.v20231130 import models
+
+        secret_id, bot_app_key, visitor_biz_id = entry.key
+        client = self._client(secret_id, entry.secret_key, entry.region)
+
+        # 实例化一个请求对象
+        req = models.GetWsTokenRequest()
+        params = {
+            "Type": 5,  # API 访客
+            "BotAppKey": bot_app_key,
+            "VisitorBizId": visitor_biz_id
+        }
+        req.from_json_string(json.dumps(params))
+
+        # 发送请求获取Token
+        fetched_at = time.monotonic()
+        with metrics.timer("tutor_token_fetch_seconds"):
+            resp = client.GetWsToken(req)
+        with self._cond:
+            self.calls += 1
+        token = json.loads(resp.to_json_string()).get("Token", "")
+        if not token:
+            raise TencentCloudSDKException("InvalidToken", "GetWsToken未返回Token")
+        return fetched_at + self.ttl, token
+
+    def acquire(self, secret_id, secret_key, bot_app_key, visitor_biz_id, region="ap-guangzhou"):
+        """取一个尚未使用且未过期的Token，缓存为空时才同步调用GetWsToken
+
+        其他线程正在为同一组凭证获取Token时先等它完成，获取的一方按等待的人数多取几个。
+        """
+        key = (secret_id, bot_app_key, visitor_biz_id)
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is None or entry.secret_key != secret_key or entry.region != region:
+                entry = _Entry(key, secret_key, region)
+                self._entries[key] = entry
+            entry.last_used = time.monotonic()
+            entry.taken = True
+            self._start_refiller()
+            while True:
+                token = self._pop(entry, time.monotonic())
+                if token is not None or not entry.fetching:
+                    break
+                entry.waiters += 1
+                self._cond.wait(timeout=self.ttl)
+                entry.waiters -= 1
+            if token is None:
+                entry.fetching = True
+            self._cond.notify_all()
+        metrics.inc("tutor_token_acquire_total", source="fetch" if token is None else "pool")
+        if token is None:
+            try:
+                token = self._fetch(entry)[1]
+                try:
+                    self._fill(entry, lambda: entry.waiters)
+                except Exception:
+                    # 多取的Token失败不影响本次结果，等待的调用自己再取并得到错误
+                    pass
+            finally:
+                with self._cond:
+                    entry.fetching = False
+                    self._cond.notify_all()
+        return token
+
+    def _pop(self, entry, now):
+        while entry.tokens:
+            expires_at, token = entry.tokens.popleft()
+            if expires_at - now > self.margin:
+                return token
+        return None
+
+    def _fill(self, entry, target):
+        """取Token放进缓存，直到缓存的个数不少于target()；调用方已把entry.fetching置为True"""
+        while True:
+            with self._cond:
+                if len(entry.tokens) >= target():
+                    return
+            item = self._fetch(entry)
+            with self._cond:
+                entry.tokens.append(item)
+                self._cond.notify_all()
+
+    def _start_refiller(self):
+        if self._refiller is None:
+            self._refiller = threading.Thread(target=self._refill_loop, name="lke-token-refill", daemon=True)
+            self._refiller.start()
+
+    def _due_entries(self, now):
+        due = []
+        for entry in list(self._entries.values()):
+            if now - entry.last_used > self.idle_timeout:
+                # 长时间没人用的凭证不再续取，已缓存的Token自然过期
+                entry.tokens.clear()
+                continue
+            # 丢弃即将过期的Token；只有上次补齐之后有Token被取走时才补齐
+            while entry.tokens and entry.tokens[0][0] - now <= self.margin:
+                entry.tokens.popleft()
+            if entry.taken and not entry.fetching and len(entry.tokens) < self.pool_size:
+                entry.taken = False
+                entry.fetching = True
+                due.append(entry)
+        return due
+
+    def _refill_loop(self):
+        while True:
+            with self._cond:
+                due = self._due_entries(time.monotonic())
+                if not due:
+                    self._cond.wait(timeout=self.margin / 2)
+                    continue
+            for entry in due:
+                try:
+                    self._fill(entry, lambda: self.pool_size)
+                except Exception:
+                    # 预取失败不影响前台，暂停续取，下次取用时同步获取并抛出错误
+                    entry.last_used = time.monotonic() - self.idle_timeout
+                finally:
+                    with self._cond:
+                        entry.fetching = False
+                        self._cond.notify_all()